@@ -0,0 +1,172 @@
+import argparse
+import csv
+import gc
+import json
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from solver import CombinationSolver, Objective, parse_objective
+
+
+# Solver shared by the worker processes. With fork it is set before the pool starts, so every worker
+# reads the parent's copy through copy-on-write pages instead of parsing or unpickling its own.
+_solver = None
+_objectives = {}  # rank spec -> objective
+
+
+def _init_worker(solver):
+    global _solver
+    _solver = solver
+
+
+# A list field: a JSON list, or a CSV cell separated by semicolons ("NETW 1009; DMET 1001")
+def read_list(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(";") if part.strip()]
+    return [str(part) for part in value]
+
+
+# Group and tutorial numbers are written as 009 in the timetable, but 9 is accepted too
+def read_number(value):
+    return str(value).zfill(3)
+
+
+# Keyword arguments of CombinationSolver.best for one row of a preferences file.
+# Columns (CSV) or keys (JSONL), all optional except for a student id:
+#   student       id written back with the results (default: the row number)
+#   core          candidate core groups, e.g. "009; 010" (default: all)
+#   electives     candidate electives, e.g. "NETW 1009; DMET 1001" (default: all)
+#   n_electives   electives to take (default: 2, or fewer when fewer are listed)
+#   tutorials     allowed tutorials per elective, e.g. "NETW 1009=001 003; DMET 1001=002"
+#   seminars      candidate seminars (default: all), "none" to leave the seminar out
+#   rank          objective such as days=10,idle=1 (default: the --rank option)
+def read_preference(row, default_rank):
+    electives = read_list(row.get("electives"))
+    tutorials = row.get("tutorials") or {}
+    if isinstance(tutorials, str):
+        tutorials = dict(part.split("=", 1) for part in read_list(tutorials))
+    seminars = read_list(row.get("seminars"))
+    n_electives = row.get("n_electives")
+    return {
+        "core_groups": None if read_list(row.get("core")) is None else [read_number(number) for number in read_list(row.get("core"))],
+        "electives": electives,
+        "n_electives": int(n_electives) if n_electives not in (None, "") else min(2, len(electives)) if electives is not None else 2,
+        "elective_tutorials": {name.strip(): [read_number(number) for number in (numbers.split() if isinstance(numbers, str) else numbers)]
+                               for name, numbers in tutorials.items()},
+        "seminars": [] if seminars is not None and [name.lower() for name in seminars] == ["none"] else seminars,
+        "rank": row.get("rank") or default_rank,
+    }
+
+
+# Rows of a .csv or .jsonl preferences file as (student, row), read lazily
+def iter_preferences(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if str(path).endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for n, row in enumerate(rows, 1):
+            yield str(row.get("student") or n), row
+
+
+# Solve one chunk of students; returns their JSON lines, so results are encoded in the workers
+def _solve(chunk, default_rank, top, with_schedule):
+    lines = []
+    for student, row in chunk:
+        try:
+            preference = read_preference(row, default_rank)
+            rank = preference.pop("rank")
+            if not isinstance(rank, Objective):
+                if rank not in _objectives:
+                    _objectives[rank] = parse_objective(rank)
+                rank = _objectives[rank]
+            results = [{"cost": result.cost, "combination": result.combination._asdict(), "schedule": result.schedule}
+                       if with_schedule else {"cost": result.cost, "combination": result.combination._asdict()}
+                       for result in _solver.best(top, rank, **preference)]
+            line = {"student": student, "results": results}
+        except (KeyError, ValueError, TypeError, AttributeError, argparse.ArgumentTypeError) as error:
+            line = {"student": student, "error": f"{type(error).__name__}: {error}"}
+        lines.append(json.dumps(line) + "\n")
+    return lines
+
+
+# Students already in the output, which doubles as the checkpoint. A line cut off by an
+# interruption is truncated away so that the run can append after the last complete result.
+def read_checkpoint(path):
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "rb+") as f:
+        complete = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                done.add(json.loads(line)["student"])
+            except (ValueError, KeyError):
+                break
+            complete += len(line)
+        f.truncate(complete)
+    return done
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Find the best schedules of every student in a preferences file and append them to `output` as JSON
+# lines. `rank` is the objective of students without a rank of their own, as an Objective or a spec.
+# Students already in `output` are skipped, so an interrupted run continues where it stopped.
+# Work is handed out in chunks to a process pool with a bounded number of chunks in flight, and
+# lines are written as soon as their chunk is done, so results come out in completion order.
+def run(index, preferences, output, workers=None, rank="days=10,idle=1", top=1, chunk_size=32, with_schedule=False):
+    solver = CombinationSolver(index)
+    done = read_checkpoint(output)
+    rows = ((student, row) for student, row in iter_preferences(preferences) if student not in done)
+    arguments = (rank, top, with_schedule)
+    solved = 0
+    with open(output, "a", encoding="utf-8") as out:
+        if workers == 1:
+            _init_worker(solver)
+            for chunk in _chunks(rows, chunk_size):
+                out.writelines(_solve(chunk, *arguments))
+                out.flush()
+                solved += len(chunk)
+            return len(done), solved
+
+        if "fork" in multiprocessing.get_all_start_methods():
+            _init_worker(solver)
+            # Keep the garbage collector from touching, and so copying, the shared objects in every worker
+            gc.freeze()
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+        else:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(solver,))
+        with executor:
+            limit = 2 * (workers or os.cpu_count() or 1)
+            pending = set()
+            for chunk in _chunks(rows, chunk_size):
+                if len(pending) >= limit:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        lines = future.result()
+                        out.writelines(lines)
+                        solved += len(lines)
+                    out.flush()
+                pending.add(executor.submit(_solve, chunk, *arguments))
+            for future in as_completed(pending):
+                lines = future.result()
+                out.writelines(lines)
+                solved += len(lines)
+                out.flush()
+        gc.unfreeze()
+    return len(done), solved
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import schedule
+from solver import CampusDays, CombinationSolver, IdleSlots, Weighted
+from synthetic import generate_timetable
+
+
+# Synthetic inputs of growing size; each source is one major's export
+SIZES = {
+    "small": dict(majors=2, core_groups=12, electives=10, elective_groups=8, seminars=10),
+    "medium": dict(majors=10, core_groups=20, electives=20, elective_groups=12, seminars=15),
+    "large": dict(majors=40, core_groups=30, electives=30, elective_groups=16, seminars=20),
+}
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+
+
+# Best wall time of `repeat` runs of fn, in seconds
+def timeit(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Time every stage of the pipeline on one size; returns {stage: seconds}
+def bench_size(params, repeat, queries=200, seed=0):
+    params = dict(params)
+    sources = [generate_timetable(majors=1, seed=seed + m, **{k: v for k, v in params.items() if k != "majors"})
+               for m in range(params["majors"])]
+    parsed = [schedule.parse_data(source) for source in sources]
+    combined = schedule.combine_schedules(*parsed)
+    scanned = combined.to_schedule()  # the scanning functions walk every entry, so they get Entry records
+    index = schedule.ScheduleIndex(combined)
+    electives = index.course_names(schedule.ELECTIVE)
+    seminars = index.course_names(schedule.SEMINAR)
+    rng = random.Random(seed)
+    filters = [(rng.choice(index.core_tutorials()), rng.choice(electives), rng.choice(["All", "001", "002"]),
+                rng.choice(electives), "All", rng.choice(seminars)) for _ in range(queries)]
+    solver = CombinationSolver(index)
+
+    stages = {
+        "parse_data": lambda: [schedule.parse_data(source) for source in sources],
+        "ingest": lambda: schedule.ingest(sources),
+        "combine_schedules": lambda: schedule.combine_schedules(*parsed),
+        "extract_core_tutorials": lambda: schedule.extract_core_tutorials(scanned),
+        "extract_course_names": lambda: [schedule.extract_course_names(scanned, kind) for kind in (schedule.ELECTIVE, schedule.SEMINAR)],
+        "extract_elective_tutorials": lambda: [schedule.extract_elective_tutorials(scanned, name) for name in electives[:20]],
+        "filter_schedules": lambda: [schedule.filter_schedules(scanned, *query) for query in filters],
+        "ScheduleIndex": lambda: schedule.ScheduleIndex(combined),
+        "index.filter_schedules": lambda: [index.filter_schedules(*query) for query in filters],
+        "solver.search(10000)": lambda: [c for c, _ in zip(solver.search(electives=electives[:30]), range(10000))],
+        "solver.best(10)": lambda: solver.best(10, Weighted({CampusDays(): 10, IdleSlots(): 1}), core_groups=index.core_tutorials()[:5], electives=electives[:30]),
+    }
+    return {name: timeit(fn, repeat) for name, fn in stages.items()}
+
+
+# Memory held by what build() returns, in bytes, measured with tracemalloc
+def allocated(build):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        return tracemalloc.get_traced_memory()[0] - before, result
+    finally:
+        tracemalloc.stop()
+
+
+# Memory of the same schedule as formatted strings per entry (as parse_data used to keep them) and as
+# the app holds it: the combined CompactSchedule and the ScheduleIndex of row ids over it
+def bench_memory(params, seed=0):
+    sources = [generate_timetable(majors=1, seed=seed + m, **{k: v for k, v in params.items() if k != "majors"})
+               for m in range(params["majors"])]
+
+    def strings():
+        combined = {day: {slot: [] for slot in schedule.SLOTS} for day in schedule.DAYS}
+        for source in sources:
+            for day, slot, course_code, group, location, course_name in schedule.iter_fields(source):
+                combined[day][slot].append(f"{course_code} {group} {location} {course_name}")
+        return combined
+
+    results = {"strings": allocated(strings)[0]}
+    results["schedule"], combined = allocated(lambda: schedule.ingest(sources, workers=1))
+    results["index"], _ = allocated(lambda: schedule.ScheduleIndex(combined))
+    results["app"] = results["schedule"] + results["index"]
+    results["rows"] = combined.entry_count()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the parsing/filtering pipeline on synthetic schedules.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="stored results to compare against")
+    parser.add_argument("--save", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown over the baseline reported as a regression")
+    parser.add_argument("--memory", action="store_true", help="compare the memory of the schedule representations instead")
+    args = parser.parse_args(argv)
+
+    if args.memory:
+        for size in args.sizes:
+            memory = bench_memory(SIZES[size])
+            rows = memory.pop("rows")
+            print(f"{size}: {rows} entries")
+            for name, size_bytes in memory.items():
+                print(f"  {name:<10}{size_bytes / 2**20:10.2f} MiB{size_bytes / rows:10.1f} B/entry{size_bytes / memory['strings']:8.0%}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for size in args.sizes:
+        results[size] = bench_size(SIZES[size], args.repeat)
+        print(f"{size}: {SIZES[size]}")
+        for stage, seconds in results[size].items():
+            line = f"  {stage:<28}{seconds * 1000:10.2f} ms"
+            previous = baseline.get(size, {}).get(stage)
+            if previous:
+                change = seconds / previous - 1
+                line += f"  {change:+7.1%}"
+                if change > args.threshold:
+                    line += "  REGRESSION"
+                    regressions.append((size, stage))
+            print(line)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved baseline to {args.baseline}")
+    if regressions:
+        print(f"{len(regressions)} regressions over {args.threshold:.0%}: " + ", ".join(f"{size}/{stage}" for size, stage in regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
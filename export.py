@@ -0,0 +1,139 @@
+import csv
+import datetime
+import heapq
+import json
+import os
+from collections import defaultdict
+
+from timetable import CORE, DAYS
+
+
+# Start and end of each slot, used for calendar events
+SLOT_TIMES = {
+    "Slot 1": ("0815", "0945"),
+    "Slot 2": ("1000", "1130"),
+    "Slot 3": ("1145", "1315"),
+    "Slot 4": ("1345", "1515"),
+    "Slot 5": ("1545", "1715"),
+}
+
+FORMATS = {"json": ".json", "csv": ".csv", "ics": ".ics"}
+
+
+# Timetables of every core group from one walk over the schedule. Each entry is dropped into the bucket
+# of its group as (cell, place in cell, day, slot, entry); core lectures go into one shared bucket
+# instead of being copied to every group. A group's timetable is its bucket merged with the lectures,
+# which reproduces the entries and order of filter_schedules(schedule, group) without rescanning.
+class GroupTimetables:
+    def __init__(self, schedule):
+        self.days = list(schedule)
+        self.slots = {day: list(schedule[day]) for day in schedule}
+        self.lectures = []
+        self.groups = defaultdict(list)  # group number -> hits
+        cell = 0
+        for day in self.days:
+            for slot in self.slots[day]:
+                for place, entry in enumerate(schedule[day][slot]):
+                    if entry.category != CORE:
+                        continue
+                    if entry.is_lecture:
+                        self.lectures.append((cell, place, day, slot, entry))
+                    else:
+                        self.groups[entry.group_number].append((cell, place, day, slot, entry))
+                cell += 1
+        # Same groups and order as extract_core_tutorials
+        self.numbers = sorted(number for number, hits in self.groups.items() if any(hit[4].group_kind in ("T", "P") for hit in hits))
+
+    # (day, slot, entry) of a group's timetable in schedule order, generated lazily
+    def entries(self, number):
+        for _, _, day, slot, entry in heapq.merge(self.lectures, self.groups.get(number, []), key=lambda hit: hit[:2]):
+            yield day, slot, entry
+
+    # The timetable of a group as filter_schedules returns it
+    def timetable(self, number):
+        filtered_schedule = {day: {slot: [] for slot in self.slots[day]} for day in self.days}
+        for day, slot, entry in self.entries(number):
+            filtered_schedule[day][slot].append(entry.cell_text)
+        return filtered_schedule
+
+    # Same data as write_schedule(..., "json"), holding only this group's entries
+    def write_json(self, number, out):
+        cells = defaultdict(list)
+        for day, slot, entry in self.entries(number):
+            cells[(day, slot)].append(entry.cell_text)
+        out.write("{\n")
+        for d, day in enumerate(self.days):
+            out.write(f"  {json.dumps(day)}: {{\n")
+            for s, slot in enumerate(self.slots[day]):
+                out.write(f"    {json.dumps(slot)}: {json.dumps(cells.pop((day, slot), []))}{',' if s < len(self.slots[day]) - 1 else ''}\n")
+            out.write(f"  }}{',' if d < len(self.days) - 1 else ''}\n")
+        out.write("}\n")
+
+    # Same layout as write_schedule(..., "csv")
+    def write_csv(self, number, out):
+        writer = csv.writer(out)
+        writer.writerow(["day", "slot", "entry"])
+        for day, slot, entry in self.entries(number):
+            writer.writerow([day, slot, entry.cell_text])
+
+    # Weekly recurring events from the week of `term_start` for `weeks` weeks, in local time
+    def write_ics(self, number, out, term_start, weeks):
+        # Saturday is the first day of the week, so each day's date is counted from the Saturday before term_start
+        saturday = term_start - datetime.timedelta(days=(term_start.weekday() - 5) % 7)
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//GUC Schedule Customizer//EN", f"X-WR-CALNAME:Group {number}"]
+        out.write("".join(_fold(line) for line in lines))
+        for n, (day, slot, entry) in enumerate(self.entries(number)):
+            if slot not in SLOT_TIMES or day not in DAYS:
+                continue
+            date = (saturday + datetime.timedelta(days=DAYS.index(day))).strftime("%Y%m%d")
+            start, end = SLOT_TIMES[slot]
+            out.write("".join(_fold(line) for line in [
+                "BEGIN:VEVENT",
+                f"UID:{number}-{n}-{date}-{start}@guc-schedule-customizer",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{date}T{start}00",
+                f"DTEND:{date}T{end}00",
+                f"RRULE:FREQ=WEEKLY;COUNT={weeks}",
+                f"SUMMARY:{_escape(f'{entry.course_name} {entry.group}')}",
+                f"LOCATION:{_escape(entry.location)}",
+                "END:VEVENT",
+            ]))
+        out.write(_fold("END:VCALENDAR"))
+
+    # Write one file per group and format into `directory`, one group at a time, so only
+    # the buckets and the file being written are held in memory; returns the files written
+    def export(self, directory, formats=("json", "csv", "ics"), term_start=None, weeks=14):
+        os.makedirs(directory, exist_ok=True)
+        term_start = term_start or datetime.date.today()
+        paths = []
+        for number in self.numbers:
+            for output_format in formats:
+                path = os.path.join(directory, f"group-{number}{FORMATS[output_format]}")
+                with open(path, "w", encoding="utf-8", newline="" if output_format != "json" else None) as out:
+                    if output_format == "json":
+                        self.write_json(number, out)
+                    elif output_format == "csv":
+                        self.write_csv(number, out)
+                    else:
+                        self.write_ics(number, out, term_start, weeks)
+                paths.append(path)
+        return paths
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+# iCalendar content line, folded at 75 octets and ended with CRLF
+def _fold(line):
+    data = line.encode("utf-8")
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74
+        while data[cut] & 0xC0 == 0x80:  # Don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(data[:cut].decode("utf-8"))
+        data = data[cut:]
+    parts.append(data.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
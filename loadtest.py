@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlencode
+
+
+# Send one GET over an open keep-alive connection and return the status and body
+async def fetch(reader, writer, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1"))
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+# Request targets mixing filters, dropdown lists and tutorial lists, built from what the server offers
+async def build_targets(host, port, count, seed):
+    reader, writer = await asyncio.open_connection(host, port)
+    core = json.loads((await fetch(reader, writer, "/core-tutorials"))[1])
+    electives = json.loads((await fetch(reader, writer, "/courses?type=elective"))[1])
+    seminars = json.loads((await fetch(reader, writer, "/courses?type=seminar"))[1])
+    writer.close()
+
+    rng = random.Random(seed)
+    targets = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.7:
+            params = {"core_filter": rng.choice(core)}
+            for key in ("elective1", "elective2"):
+                if electives and rng.random() < 0.8:
+                    params[key] = rng.choice(electives)
+                    params[key + "_tut"] = rng.choice(["All", "001", "002", "003"])
+            if seminars and rng.random() < 0.5:
+                params["seminar"] = rng.choice(seminars)
+            targets.append("/filter?" + urlencode(params))
+        elif kind < 0.85 and electives:
+            targets.append("/elective-tutorials?" + urlencode({"name": rng.choice(electives)}))
+        else:
+            targets.append(rng.choice(["/core-tutorials", "/courses?type=elective", "/courses?type=seminar"]))
+    return targets
+
+
+async def worker(host, port, targets, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while targets:
+            target = targets.pop()
+            start = time.perf_counter()
+            status, _ = await fetch(reader, writer, target)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((status, target))
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run(host, port, requests, concurrency, seed):
+    targets = await build_targets(host, port, requests, seed)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, targets, latencies, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests over {concurrency} connections in {elapsed:.2f}s: {len(latencies) / elapsed:.0f} req/s")
+    for label, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+        print(f"  {label}: {percentile(latencies, fraction) * 1000:.2f} ms")
+    if errors:
+        print(f"  {len(errors)} errors, e.g. {errors[0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test a running `schedule.py serve` on localhost.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.host, args.port, args.requests, args.concurrency, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+from collections import namedtuple
+
+
+Usage = namedtuple("Usage", ["name", "rooms", "occupied", "cells", "utilization"])
+
+
+# Indexes of the set bits of a bitset, lowest first
+def _positions(rooms):
+    while rooms:
+        low = rooms & -rooms
+        yield low.bit_length() - 1
+        rooms ^= low
+
+
+# Building of a room: C7 for C7.201, H for the lecture halls H1 to H20
+def building(location):
+    if "." in location:
+        return location.split(".", 1)[0]
+    return location.rstrip("0123456789") or location
+
+
+# Occupied and free rooms per (day, slot), with every set held as a bitset over the rooms
+# (bit i is self.rooms[i]), so "free C7 labs on Tuesday slot 3" is a couple of integer ANDs
+# however many rooms and majors the schedule combines. Only rooms that appear somewhere in
+# the schedule are known, so a room that is never booked isn't reported as free.
+class RoomIndex:
+    def __init__(self, schedule):
+        self.days = list(schedule)
+        self.slots = {day: list(schedule[day]) for day in schedule}
+        locations = sorted({entry.location for slots in schedule.values() for entries in slots.values() for entry in entries})
+        self.rooms = locations
+        self.bits = {room: 1 << i for i, room in enumerate(locations)}
+        self.all_rooms = (1 << len(locations)) - 1
+        self.buildings = {}  # building -> rooms
+        for room, bit in self.bits.items():
+            self.buildings[building(room)] = self.buildings.get(building(room), 0) | bit
+        self.kinds = {}  # session type, e.g. Lab, Tut or Lecture -> rooms that host it
+        self.occupied = {}  # (day, slot) -> rooms
+        for day in self.days:
+            for slot in self.slots[day]:
+                rooms = 0
+                for entry in schedule[day][slot]:
+                    bit = self.bits[entry.location]
+                    rooms |= bit
+                    self.kinds[entry.session_type] = self.kinds.get(entry.session_type, 0) | bit
+                self.occupied[(day, slot)] = rooms
+
+    # Rooms of a bitset, in room order
+    def names(self, rooms):
+        return [self.rooms[i] for i in _positions(rooms)]
+
+    # Bitset of the rooms in a building (e.g., C7) that host a kind of session (e.g., Lab); None means any
+    def select(self, building_name=None, kind=None):
+        rooms = self.all_rooms
+        if building_name is not None:
+            rooms &= self.buildings.get(building_name, 0)
+        if kind is not None:
+            rooms &= self.kinds.get(kind, 0)
+        return rooms
+
+    def free(self, day, slot, building_name=None, kind=None):
+        return self.names(self.select(building_name, kind) & ~self.occupied[(day, slot)])
+
+    def busy(self, day, slot, building_name=None, kind=None):
+        return self.names(self.select(building_name, kind) & self.occupied[(day, slot)])
+
+    # Number of (day, slot) cells each room is booked in
+    def _counts(self):
+        counts = [0] * len(self.rooms)
+        for rooms in self.occupied.values():
+            for i in _positions(rooms):
+                counts[i] += 1
+        return counts
+
+    # Usage of every room, or of every building when by_building is set, as the share of
+    # the week's cells it is booked in
+    def utilization(self, by_building=False, building_name=None, kind=None):
+        cells = len(self.occupied)
+        counts = self._counts()
+        selected = self.select(building_name, kind)
+        groups = self.buildings.items() if by_building else self.bits.items()
+        usage = []
+        for name, rooms in groups:
+            rooms &= selected
+            if not rooms:
+                continue
+            members = list(_positions(rooms))
+            occupied = sum(counts[i] for i in members)
+            usage.append(Usage(name, len(members), occupied, cells * len(members), occupied / (cells * len(members))))
+        return usage
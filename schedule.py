@@ -1,44 +1,546 @@
-import tkinter as tk
-from tkinter import ttk, font
+import argparse
+import atexit
+import csv
+import datetime
+import functools
+import hashlib
+import itertools
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, defaultdict, namedtuple
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from types import MappingProxyType
+
+from solver import CampusDays, ChoicePropagator, Combination, CombinationSolver, CompatibilityMatrix, IdleSlots, Weighted, parse_objective
+from timetable import CORE, DAYS, ELECTIVE, SEMINAR, SLOTS, Entry, course_category
+
+
+# Opt-in timing and counters per phase (parse, combine, index, filter, render...).
+# Enabled with SCHEDULE_PROFILE=1 or --profile, which print a summary at exit, and with
+# SCHEDULE_TRACE=<path> or --trace <path>, which also write a Chrome trace (chrome://tracing).
+# When disabled, a timed call costs one attribute check.
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.times = defaultdict(float)  # phase -> seconds
+        self.calls = defaultdict(int)  # phase -> calls
+        self.counters = defaultdict(int)  # e.g., entries scanned, cells repainted
+        self.trace_path = None
+        self.events = []  # Chrome trace events, only kept when tracing
+        self._start = time.perf_counter()
+
+    def enable(self, trace_path=None):
+        if not self.enabled:
+            atexit.register(self.report)
+        self.enabled = True
+        self.trace_path = trace_path or self.trace_path
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def add(self, phase, start, end):
+        self.times[phase] += end - start
+        self.calls[phase] += 1
+        if self.trace_path:
+            self.events.append({"name": phase, "ph": "X", "pid": os.getpid(), "tid": threading.get_ident(),
+                                "ts": (start - self._start) * 1e6, "dur": (end - start) * 1e6})
+
+    # Decorator timing every call of a function as one phase
+    def timed(self, phase):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.add(phase, start, time.perf_counter())
+            return wrapper
+        return decorator
+
+    def report(self, out=None):
+        out = out or sys.stderr
+        out.write(f"{'phase':<24}{'calls':>8}{'total ms':>12}{'mean ms':>12}\n")
+        for phase, seconds in sorted(self.times.items(), key=lambda item: -item[1]):
+            out.write(f"{phase:<24}{self.calls[phase]:>8}{seconds * 1000:>12.2f}{seconds * 1000 / self.calls[phase]:>12.3f}\n")
+        for name, value in sorted(self.counters.items()):
+            out.write(f"{name:<24}{value:>8}\n")
+        if self.trace_path:
+            with open(self.trace_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+            out.write(f"Chrome trace written to {self.trace_path}\n")
+
+
+profiler = Profiler()
+if os.environ.get("SCHEDULE_PROFILE") or os.environ.get("SCHEDULE_TRACE"):
+    profiler.enable(os.environ.get("SCHEDULE_TRACE"))
+
+
+_CHUNK_SIZE = 1 << 20
+
+# Iterate over a source as blocks of UTF-8 bytes that each end at a line break (or at the end):
+# timetable text, bytes, a path, a text or binary file object, or any iterable of lines
+def iter_chunks(source, size=_CHUNK_SIZE):
+    if isinstance(source, (str, bytes, bytearray)):
+        newline = "\n" if isinstance(source, str) else b"\n"
+        start = 0
+        while start < len(source):
+            end = source.find(newline, start + size)
+            end = len(source) if end == -1 else end + 1
+            block = source[start:end]
+            yield block.encode("utf-8") if isinstance(block, str) else bytes(block)
+            start = end
+    elif isinstance(source, os.PathLike) or hasattr(source, "read"):
+        f = open(source, "rb") if isinstance(source, os.PathLike) else source
+        try:
+            while True:
+                block = f.read(size)
+                if not block:
+                    return
+                block += f.readline()  # Finish the last line
+                yield block.encode("utf-8") if isinstance(block, str) else block
+        finally:
+            if f is not source:
+                f.close()
+    else:
+        lines = []
+        length = 0
+        for line in source:
+            line = line.encode("utf-8") if isinstance(line, str) else line
+            lines.append(line if line.endswith(b"\n") else line + b"\n")
+            length += len(line)
+            if length >= size:
+                yield b"".join(lines)
+                lines, length = [], 0
+        if lines:
+            yield b"".join(lines)
+
+
+# A problem found while parsing, at a 1-based line of the source
+ParseDiagnostic = namedtuple("ParseDiagnostic", ["line", "severity", "message", "text"])
+
+
+class ScheduleParseError(ValueError):
+    def __init__(self, diagnostics):
+        super().__init__(diagnostics)
+        self.diagnostics = diagnostics
+
+    def __str__(self):
+        errors = [diagnostic for diagnostic in self.diagnostics if diagnostic.severity == "error"]
+        lines = [f"line {d.line}: {d.message}" + (f": {d.text!r}" if d.text else "") for d in errors[:10]]
+        if len(errors) > 10:
+            lines.append(f"... and {len(errors) - 10} more errors")
+        return "malformed timetable\n  " + "\n  ".join(lines)
+
+
+# Version of what iter_fields makes of a source, part of every ScheduleCache key. Bump it whenever
+# a change to parsing changes the result for some text, so parses cached before are redone.
+_PARSER_VERSION = 2
+
+# What a one-word line is: a day header (the day if the grid has it, else None) or Free
+_KEYWORDS = {day: day for day in DAYS}
+_KEYWORDS.update({"Friday": None, "Free": "Free"})
+
+# Stream (day, slot, course code, group, location, course name) fields from a source. The source is
+# read in blocks of bytes that are decoded and split into lines in one go each, and every line is
+# split once and told apart by its number of words, with a lookup for the one-word lines.
+#
+# Day headers and slot separators are checked as they go by: entries before the first day, entries
+# past the last slot of a day or on a day the grid doesn't have (Friday), days without exactly one
+# separator per slot, repeated days and lines that aren't a day, a separator, Free or an entry of
+# course code, group, location and course name are reported as ParseDiagnostics. When a
+# `diagnostics` list is given they are appended to it and bad lines are skipped; otherwise a
+# ScheduleParseError listing them is raised once the source is read, if any is an error.
+def iter_fields(source, diagnostics=None):
+    found = []
+    day = None  # None before the first day and on days outside the grid
+    header = None  # the current day header
+    seen = set()
+    slot = 0
+    n_slots = len(SLOTS)
+    line_number = 0  # lines in the blocks before this one
+
+    def end_day(number):
+        if header is not None and slot != n_slots:
+            found.append(ParseDiagnostic(number, "error", f"{header} has {slot} slot separators, expected {n_slots}", ""))
+
+    for block in iter_chunks(source):
+        for number, line in enumerate(block.decode("utf-8").split("\n"), line_number + 1):
+            parts = line.split(None, 3)
+            words = len(parts)
+            if words == 4:
+                if day is not None and slot < n_slots:
+                    course_name = parts[3]
+                    if "  " in course_name or "\t" in course_name or course_name[-1:].isspace():
+                        course_name = " ".join(course_name.split())
+                    yield day, SLOTS[slot], parts[0], parts[1], parts[2], course_name
+                elif header is None:
+                    found.append(ParseDiagnostic(number, "error", "entry before the first day header", line.strip()))
+                elif day is None:
+                    found.append(ParseDiagnostic(number, "error", f"entry on {header}, which the timetable grid doesn't have", line.strip()))
+                else:
+                    found.append(ParseDiagnostic(number, "error", f"entry after the last slot of {day}", line.strip()))
+            elif words == 1:
+                word = parts[0]
+                if word.startswith("**"):
+                    slot += 1
+                elif word in _KEYWORDS:
+                    if word == "Free":
+                        continue
+                    end_day(number)
+                    if word in seen:
+                        found.append(ParseDiagnostic(number, "error", f"{word} appears twice", word))
+                    seen.add(word)
+                    header = word
+                    day = _KEYWORDS[word]
+                    slot = 0
+                else:
+                    found.append(ParseDiagnostic(number, "error", "expected a day, Free, a line of asterisks or course code, group, location and course name", word))
+            elif words and not parts[0].startswith("**"):
+                found.append(ParseDiagnostic(number, "error", "expected a day, Free, a line of asterisks or course code, group, location and course name", line.strip()))
+            elif words:
+                slot += 1  # A separator with spaces in it
+        line_number += block.count(b"\n")
+    end_day(line_number)
+    missing = [name for name in DAYS if name not in seen]
+    if missing:
+        found.append(ParseDiagnostic(line_number, "warning" if seen else "error", f"no {', '.join(missing)} in the timetable", ""))
+
+    if diagnostics is not None:
+        diagnostics.extend(found)
+    elif any(diagnostic.severity == "error" for diagnostic in found):
+        raise ScheduleParseError(found)
+
+# Stream (day, slot, entry) tuples from a source, one line at a time
+def iter_entries(source, diagnostics=None):
+    for day, slot, course_code, group, location, course_name in iter_fields(source, diagnostics):
+        yield day, slot, Entry(course_code, group, location, course_name)
+
+# Symbol table handing out one small integer id per distinct string. The strings are held joined in
+# one str with the offset each starts at, much like the string table of the cache files, rather than
+# as a str object each: most locations occur once or twice, and a str object costs about 50 bytes.
+class SymbolTable:
+    __slots__ = ("text", "offsets", "ids", "_pending")
+
+    def __init__(self, strings=()):
+        self.text = ""
+        self.offsets = array("I", [0])  # symbol i is text[offsets[i]:offsets[i + 1]]
+        self.ids = None  # string -> id, built while strings are added (see release)
+        self._pending = []  # strings added but not joined into text yet
+        for string in strings:
+            self.id(string)
+        self.release()
+
+    def id(self, string):
+        if self.ids is None:
+            self.ids = {string: i for i, string in enumerate(self)}
+        symbol = self.ids.get(string)
+        if symbol is None:
+            symbol = self.ids[string] = len(self.offsets) - 1
+            self._pending.append(string)
+            self.offsets.append(self.offsets[-1] + len(string))
+        return symbol
+
+    def _join(self):
+        self.text += "".join(self._pending)
+        self._pending.clear()
+
+    # Drop the string -> id dict once the strings are all in, as it takes more memory than the
+    # strings themselves; id() builds it again if more come
+    def release(self):
+        self._join()
+        self.ids = None
+
+    def __getitem__(self, symbol):
+        if self._pending:
+            self._join()
+        return self.text[self.offsets[symbol]:self.offsets[symbol + 1]]
+
+    # The joined text and the offsets, to slice many strings out of it at once
+    def slices(self):
+        self._join()
+        return self.text, self.offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # Pickled as the text and offsets; the ids are rebuilt when needed
+    def __reduce__(self):
+        self._join()
+        return _restore_symbols, (self.text, self.offsets)
+
+
+def _restore_symbols(text, offsets):
+    symbols = SymbolTable()
+    symbols.text = text
+    symbols.offsets = offsets
+    return symbols
+
+
+# The schedule as a column store: one row per entry, with the day, slot and source as small integers
+# and every text field an id into one shared symbol table, held in `array` columns, and the rows of
+# each (day, slot) cell in order. parse_data and combine_schedules return it, ScheduleIndex points
+# into it with row ids, parse workers send it back and ScheduleCache stores its columns.
+#
+# Read as a mapping of days -> slots -> entries, it builds the Entry records of a cell when the cell
+# is read, so the running app holds no Entry or display string per row (see bench.py --memory).
+class CompactSchedule(Mapping):
+    def __init__(self):
+        self.symbols = SymbolTable()
+        self.days = array("B")
+        self.slots = array("B")
+        self.course_codes = array("I")
+        self.groups = array("I")
+        self.locations = array("I")
+        self.course_names = array("I")
+        self.sources = array("H")  # which of the combined schedules the row came from
+        self.cells = [array("I") for _ in range(len(DAYS) * len(SLOTS))]  # cell number -> rows (an array or a range), in order
+        self.ordered = False  # whether the row ids follow the order of the entries (see combine)
+        self._tokens = ({}, {})  # symbol -> category of a course code, tokens of a course name
+
+    # Add a row without putting it in a cell
+    def _add(self, day_index, slot_index, course_code, group, location, course_name, source):
+        symbol = self.symbols.id
+        self.ordered = False
+        self.days.append(day_index)
+        self.slots.append(slot_index)
+        self.course_codes.append(symbol(course_code))
+        self.groups.append(symbol(group))
+        self.locations.append(symbol(location))
+        self.course_names.append(symbol(course_name))
+        self.sources.append(source)
+        return len(self.days) - 1
+
+    def append(self, day, slot, course_code, group, location, course_name, source=0):
+        day_index, slot_index = DAYS.index(day), SLOTS.index(slot)
+        row = self._add(day_index, slot_index, course_code, group, location, course_name, source)
+        self.cells[day_index * len(SLOTS) + slot_index].append(row)
+
+    @classmethod
+    def from_schedule(cls, schedule):
+        compact = cls()
+        for day in schedule:
+            for slot in schedule[day]:
+                for entry in schedule[day][slot]:
+                    compact.append(day, slot, entry.course_code, entry.group, entry.location, entry.course_name)
+        compact.symbols.release()
+        return compact
+
+    # Schedule of the entries of several CompactSchedules, numbering each as a source by its place.
+    # Rows are laid out cell by cell and within a cell source by source, i.e. in the order of the
+    # entries, so every cell is a range of row ids and sort_rows sorts by row id alone until set_cells adds rows.
+    @classmethod
+    def combine(cls, schedules):
+        combined = cls()
+        remaps = [[combined.symbols.id(string) for string in schedule.symbols] for schedule in schedules]
+        for cell in range(len(combined.cells)):
+            day_index, slot_index = divmod(cell, len(SLOTS))
+            start = len(combined.days)
+            for source, (schedule, remap) in enumerate(zip(schedules, remaps)):
+                other = schedule.cells[cell]
+                combined.days.extend(array("B", [day_index]) * len(other))
+                combined.slots.extend(array("B", [slot_index]) * len(other))
+                for column, other_column in zip(combined.columns()[2:], schedule.columns()[2:]):
+                    column.extend(map(remap.__getitem__, map(other_column.__getitem__, other)))
+                combined.sources.extend(array("H", [source]) * len(other))
+            combined.cells[cell] = range(start, len(combined.days))
+        combined.symbols.release()
+        combined.ordered = True
+        return combined
+
+    # Replace the entries `source` has in some cells, given as {(day, slot): [fields]} with the fields
+    # of iter_fields, and keep the entries of the other sources where they are. Replaced rows leave
+    # their cells but stay in the columns. Returns the rows taken out and the rows added.
+    def set_cells(self, cells, source=0):
+        removed, added = [], []
+        sources = self.sources
+        for (day, slot), entries in cells.items():
+            day_index, slot_index = DAYS.index(day), SLOTS.index(slot)
+            cell = day_index * len(SLOTS) + slot_index
+            rows = self.cells[cell]
+            new = [self._add(day_index, slot_index, *fields, source) for fields in entries]
+            removed.extend(row for row in rows if sources[row] == source)
+            added.extend(new)
+            self.cells[cell] = array("I", [row for row in rows if sources[row] < source] + new + [row for row in rows if sources[row] > source])
+        self.symbols.release()
+        return removed, added
+
+    # Put the rows in their cells again, in row order, after the columns were filled directly
+    def _fill_cells(self):
+        self.cells = [array("I") for _ in range(len(DAYS) * len(SLOTS))]
+        n_slots = len(SLOTS)
+        for row, (day_index, slot_index) in enumerate(zip(self.days, self.slots)):
+            self.cells[day_index * n_slots + slot_index].append(row)
+
+    def columns(self):
+        return self.days, self.slots, self.course_codes, self.groups, self.locations, self.course_names
+
+    # Number of entries, which leaves out rows replaced by set_cells
+    def entry_count(self):
+        return sum(len(rows) for rows in self.cells)
+
+    def __getitem__(self, day):
+        if day not in DAYS:
+            raise KeyError(day)
+        return _CompactDay(self, day)
+
+    def __iter__(self):
+        return iter(DAYS)
+
+    def __len__(self):
+        return len(DAYS)
+
+    def rows(self, day, slot):
+        return self.cells[DAYS.index(day) * len(SLOTS) + SLOTS.index(slot)]
+
+    def cell_number(self, row):
+        return self.days[row] * len(SLOTS) + self.slots[row]
+
+    # Rows in the order their entries have in the schedule: by cell, then by source, then as added
+    def sort_rows(self, rows):
+        if self.ordered:
+            return sorted(rows)
+        days, slots, sources, n_slots = self.days, self.slots, self.sources, len(SLOTS)
+        return sorted(rows, key=lambda row: (days[row] * n_slots + slots[row]) << 48 | sources[row] << 32 | row)
+
+    # Course code, group, location and course name of a row, as iter_fields gives them
+    def fields(self, row):
+        symbols = self.symbols
+        return symbols[self.course_codes[row]], symbols[self.groups[row]], symbols[self.locations[row]], symbols[self.course_names[row]]
+
+    # What the index needs of a row's fields. The category of a course code and (base name, is lecture)
+    # of a course name are worked out once per symbol and shared by every row that has it; the kind and
+    # number of a group are just its first character and the rest.
+    def category(self, row):
+        symbol = self.course_codes[row]
+        category = self._tokens[0].get(symbol)
+        if category is None:
+            category = self._tokens[0][symbol] = course_category(self.symbols[symbol])
+        return category
+
+    def group_kind(self, row):
+        return self.symbols[self.groups[row]][:1]
+
+    def group_number(self, row):
+        return sys.intern(self.symbols[self.groups[row]][1:])
+
+    def name_tokens(self, row):
+        symbol = self.course_names[row]
+        tokens = self._tokens[1].get(symbol)
+        if tokens is None:
+            base_name, _, session_type = self.symbols[symbol].rpartition(" ")
+            tokens = self._tokens[1][symbol] = (sys.intern(base_name), session_type.lower() == "lecture")
+        return tokens
+
+    # Entry of a row, only built when it is read (e.g., to render its cell)
+    def entry(self, row):
+        return Entry(*self.fields(row))
+
+    def cell_text(self, row):
+        return self.cell_texts([row])[0]
+
+    # cell_text of many rows, sliced straight out of the symbol text
+    def cell_texts(self, rows):
+        text, offsets = self.symbols.slices()
+        return [f"{text[offsets[group]:offsets[group + 1]]} {text[offsets[name]:offsets[name + 1]]} {text[offsets[location]:offsets[location + 1]]}"
+                for group, name, location in zip(map(self.groups.__getitem__, rows), map(self.course_names.__getitem__, rows),
+                                                 map(self.locations.__getitem__, rows))]
+
+    # Entries of one cell, built on demand
+    def cell(self, day, slot):
+        return [self.entry(row) for row in self.rows(day, slot)]
+
+    # Plain dict of days -> slots -> entries, for code that walks every entry over and over
+    # (e.g., the scanning functions in bench.py); it holds an Entry per row
+    def to_schedule(self):
+        return {day: {slot: self.cell(day, slot) for slot in SLOTS} for day in DAYS}
+
+
+# One day of a CompactSchedule, as a mapping of slots -> entries
+class _CompactDay(Mapping):
+    def __init__(self, schedule, day):
+        self.schedule = schedule
+        self.day = day
+
+    def __getitem__(self, slot):
+        if slot not in SLOTS:
+            raise KeyError(slot)
+        return self.schedule.cell(self.day, slot)
+
+    def __iter__(self):
+        return iter(SLOTS)
+
+    def __len__(self):
+        return len(SLOTS)
 
 
 # Parse the data into a structured format
-def parse_data(data):
-    days = ["Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
-    schedule = {day: {f"Slot {i+1}": [] for i in range(5)} for day in days}
-    current_day = None
-    current_slot = 0
-
-    for line in data.strip().split("\n"):
-        line = line.strip()
-        if line in days:
-            current_day = line
-            current_slot = 0
-        elif line.startswith("**"):
-            current_slot += 1
-        elif line != "Free":
-            # Split the line into components
-            parts = line.split()
-            if len(parts) >= 4:
-                course_code = parts[0]
-                group = parts[1]
-                location = parts[2]
-                course_name = " ".join(parts[3:])
-                entry = f"{course_code} {group} {location} {course_name}"
-                schedule[current_day][f"Slot {current_slot+1}"].append(entry)
+@profiler.timed("parse")
+def parse_data(data, diagnostics=None):
+    schedule = CompactSchedule()
+    for fields in iter_fields(data, diagnostics):
+        schedule.append(*fields)
+    schedule.symbols.release()
+    if profiler.enabled:
+        profiler.count("entries parsed", schedule.entry_count())
     return schedule
 
-
-# Combine multiple schedules
+# Combine multiple schedules in a single pass over all of them; each entry's source is the number of its schedule
+@profiler.timed("combine")
 def combine_schedules(*schedules):
-    combined = {}
-    days = ["Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
-    for day in days:
-        combined[day] = {f"Slot {i+1}": [] for i in range(5)}
-        for schedule in schedules:
-            for slot in schedule[day]:
-                combined[day][slot].extend(schedule[day][slot])
-    return combined
+    return CompactSchedule.combine([schedule if isinstance(schedule, CompactSchedule) else CompactSchedule.from_schedule(schedule)
+                                    for schedule in schedules])
+
+# Text of the sources worth starting a process pool for; below it, parsing in this process is faster
+# than starting the workers (the two embedded sources parse in about a millisecond)
+_POOL_THRESHOLD = 1 << 20
+
+
+def _source_size(source):
+    if isinstance(source, (str, bytes, bytearray)):
+        return len(source)
+    if isinstance(source, os.PathLike):
+        try:
+            return os.path.getsize(source)
+        except OSError:
+            return 0
+    return None  # Open files and iterators can't be sent to another process
+
+
+# Parse sources, in a process pool when there are several and enough text to make up for starting it.
+# Workers send back CompactSchedules, which pickle as a few arrays and one symbol table, so the parent
+# doesn't unpickle an Entry record per row.
+def _parse_sources(sources, workers=None):
+    sizes = [_source_size(source) for source in sources]
+    if len(sources) <= 1 or workers == 1 or None in sizes or sum(sizes) < _POOL_THRESHOLD:
+        return [parse_data(source) for source in sources]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(parse_data, sources))
+
+# Parse several sources, reusing cached parses when a cache is given; returns one schedule per source
+def parse_sources(sources, workers=None, cache=None):
+    sources = list(sources)
+    if len(sources) == 0:
+        raise ValueError("No data provided")
+    if cache is not None:
+        return cache.parse(sources, workers)
+    return _parse_sources(sources, workers)
+
+# Parse several sources and merge them once
+@profiler.timed("ingest")
+def ingest(sources, workers=None, cache=None):
+    return combine_schedules(*parse_sources(sources, workers, cache))
 
 # Extract unique tutorial numbers for core courses
 def extract_core_tutorials(schedule):
@@ -46,10 +548,8 @@ def extract_core_tutorials(schedule):
     for day in schedule:
         for slot in schedule[day]:
             for entry in schedule[day][slot]:
-                if "-EL" not in entry and "-Seminar" not in entry:
-                    group = entry.split()[1]  # Extract group (e.g., T009, P008)
-                    if group[0] in ["T", "P"]:  # Only consider T and P groups
-                        tutorials.add(group[1:])  # Add the number part (e.g., 009, 008)
+                if entry.category == CORE and entry.group_kind in ("T", "P"):  # Only consider T and P groups
+                    tutorials.add(entry.group_number)  # Add the number part (e.g., 009, 008)
     return sorted(tutorials)
 
 # Extract unique course names for electives and seminars (without suffixes)
@@ -58,14 +558,8 @@ def extract_course_names(schedule, course_type):
     for day in schedule:
         for slot in schedule[day]:
             for entry in schedule[day][slot]:
-                if course_type == "elective" and "-EL" in entry:
-                    course_name = " ".join(entry.split()[3:])  # Full course name
-                    base_name = " ".join(course_name.split()[:-1])  # Remove suffix (e.g., "Lecture", "Lab")
-                    course_names.add(base_name)
-                elif course_type == "seminar" and "-Seminar" in entry:
-                    course_name = " ".join(entry.split()[3:])  # Full course name
-                    base_name = " ".join(course_name.split()[:-1])  # Remove suffix (e.g., "Lecture", "Lab")
-                    course_names.add(base_name)
+                if entry.category == course_type:
+                    course_names.add(entry.base_name)
     return sorted(course_names)
 
 # Extract unique tutorial numbers for electives
@@ -74,61 +568,663 @@ def extract_elective_tutorials(schedule, elective_name):
     for day in schedule:
         for slot in schedule[day]:
             for entry in schedule[day][slot]:
-                if "-EL" in entry:
-                    course_name = " ".join(entry.split()[3:])  # Full course name
-                    base_name = " ".join(course_name.split()[:-1])  # Remove suffix
-                    if base_name == elective_name:
-                        group = entry.split()[1]  # Extract group (e.g., T009, P008)
-                        if group[0] in ["T", "P"]:  # Only consider T and P groups
-                            tutorials.add(group[1:])  # Add the number part (e.g., 009, 008)
+                if entry.category == ELECTIVE and entry.base_name == elective_name and entry.group_kind in ("T", "P"):
+                    tutorials.add(entry.group_number)
     return sorted(tutorials)
 
+@profiler.timed("filter")
 def filter_schedules(schedule, core_filter=None, elective1=None, elective1_tut=None, elective2=None, elective2_tut=None, seminar=None):
     filtered_schedule = {day: {slot: [] for slot in schedule[day]} for day in schedule}
 
     for day in schedule:
         for slot in schedule[day]:
+            cell = filtered_schedule[day][slot]
             for entry in schedule[day][slot]:
-                entry_split = entry.split()
-                cell_text = f"{entry_split[1]} {' '.join(entry_split[3:])} {entry_split[2]}"
-                if "-EL" not in entry and "-Seminar" not in entry:
-                    # Always include core lectures
-                    if "Lecture" in entry:
-                        filtered_schedule[day][slot].append(cell_text)
-                    # Include core tutorials and labs if core_filter matches
-                    elif core_filter is None or core_filter in entry:
-                        filtered_schedule[day][slot].append(cell_text)
-                elif "-EL" in entry:
-                    course_name = " ".join(entry_split[3:])  # Full course name
-                    base_name = " ".join(course_name.split()[:-1])  # Remove suffix
-                    group = entry_split[1]  # Extract group (e.g., T009, P008)
-                    if (elective1 is not None and elective1 == base_name and (elective1_tut is None or elective1_tut == "All" or group[1:] == elective1_tut or 'lecture' in course_name.lower())) or \
-                       (elective2 is not None and elective2 == base_name and (elective2_tut is None or elective2_tut == "All" or group[1:] == elective2_tut or 'lecture' in course_name.lower())):
-                        filtered_schedule[day][slot].append(cell_text)
-                elif "-Seminar" in entry:
-                    course_name = " ".join(entry_split[3:])  # Full course name
-                    base_name = " ".join(course_name.split()[:-1])  # Remove suffix
-                    if seminar is not None and seminar == base_name:
-                        filtered_schedule[day][slot].append(cell_text)
+                if entry.category == CORE:
+                    # Always include core lectures, and core tutorials and labs if core_filter matches
+                    if entry.is_lecture or core_filter is None or core_filter == entry.group_number or core_filter == entry.group:
+                        cell.append(entry.cell_text)
+                elif entry.category == ELECTIVE:
+                    if (elective1 is not None and elective1 == entry.base_name and (elective1_tut is None or elective1_tut == "All" or entry.group_number == elective1_tut or entry.is_lecture)) or \
+                       (elective2 is not None and elective2 == entry.base_name and (elective2_tut is None or elective2_tut == "All" or entry.group_number == elective2_tut or entry.is_lecture)):
+                        cell.append(entry.cell_text)
+                elif seminar is not None and seminar == entry.base_name:
+                    cell.append(entry.cell_text)
+    if profiler.enabled:
+        profiler.count("entries scanned", sum(len(entries) for slots in schedule.values() for entries in slots.values()))
     return filtered_schedule
 
 
+# Inverted index over the schedule, built once so that tutorial lists and
+# filtered timetables are lookups that scale with the size of the result
+class ScheduleIndex:
+    @profiler.timed("index")
+    def __init__(self, schedule, derived=None):
+        if not isinstance(schedule, CompactSchedule):
+            schedule = CompactSchedule.from_schedule(schedule)
+        self.schedule = schedule
+        # Every bucket is an array of row ids into the CompactSchedule, so the index holds no entries
+        # Core lectures are kept apart per source and course code: a core group attends the lectures of
+        # its own source (e.g., groups 005 to 015 attend L001 and groups 016 to 026 attend L002)
+        self.core_lectures = {}  # (source, course code) -> rows of its lectures
+        self.core_groups = {}  # group number (e.g., 009) -> rows of its tutorials and labs
+        self.courses = {ELECTIVE: {}, SEMINAR: {}}  # base name -> rows of its lectures and groups
+        # Rows with the same source, course code, course name and group go in the same bucket, which is looked up once
+        buckets = {}
+        sources, codes, names, groups = schedule.sources, schedule.course_codes, schedule.course_names, schedule.groups
+        for rows in schedule.cells:
+            for row in rows:
+                key = ((sources[row] << 32 | codes[row]) << 32 | names[row]) << 32 | groups[row]
+                bucket = buckets.get(key)
+                if bucket is None:
+                    bucket = buckets[key] = self._bucket(row)
+                bucket.append(row)
+        # Arrays over-allocate as they grow, so the filled buckets are copied at their exact size
+        self.core_lectures = {key: array("I", rows) for key, rows in self.core_lectures.items()}
+        self.core_groups = {number: array("I", rows) for number, rows in self.core_groups.items()}
+        for category, courses in self.courses.items():
+            self.courses[category] = {name: array("I", rows) for name, rows in courses.items()}
+
+        if derived is None:
+            derived = self.derived_lists()
+        self._core_tutorials = derived["core_tutorials"]
+        self._elective_tutorials = derived["elective_tutorials"]
+
+    # Bucket a row belongs to, created on demand
+    def _bucket(self, row):
+        schedule = self.schedule
+        category = schedule.category(row)
+        base_name, is_lecture = schedule.name_tokens(row)
+        if category == CORE:
+            if is_lecture:
+                return self.core_lectures.setdefault(self._lecture_key(row), array("I"))
+            return self.core_groups.setdefault(schedule.group_number(row), array("I"))
+        return self.courses[category].setdefault(base_name, array("I"))
+
+    def _lecture_key(self, row):
+        return self.schedule.sources[row], self.schedule.course_codes[row]
+
+    # Re-index rows after CompactSchedule.set_cells took `removed` out of their cells and added `added`.
+    # Returns the core group numbers, electives and seminars that had entries added or removed;
+    # a core lecture that came or went changes every group that attends it.
+    def update_rows(self, removed, added):
+        schedule = self.schedule
+        changed = {CORE: set(), ELECTIVE: set(), SEMINAR: set()}
+        for row in removed:
+            self._bucket(row).remove(row)
+        for row in added:
+            self._bucket(row).append(row)
+        # Only entries that came or went change a group, so an entry put back in the same cell is skipped
+        kept = {(schedule.cell_number(row), schedule.fields(row)) for row in removed} & \
+               {(schedule.cell_number(row), schedule.fields(row)) for row in added}
+        lectures = set()
+        for row in itertools.chain(removed, added):
+            if (schedule.cell_number(row), schedule.fields(row)) in kept:
+                continue
+            category = schedule.category(row)
+            base_name, is_lecture = schedule.name_tokens(row)
+            if category != CORE:
+                changed[category].add(base_name)
+            elif is_lecture:
+                lectures.add(self._lecture_key(row))
+            else:
+                changed[CORE].add(schedule.group_number(row))
+        if lectures:
+            changed[CORE].update(number for number, rows in self.core_groups.items()
+                                 if any(self._lecture_key(row) in lectures for row in rows))
+
+        # Drop emptied buckets and courses, then refresh the derived lists of the groups involved
+        for buckets in (self.core_lectures, self.core_groups):
+            for key in [key for key, bucket in buckets.items() if not bucket]:
+                del buckets[key]
+        for courses in self.courses.values():
+            for name in [name for name, rows in courses.items() if not rows]:
+                del courses[name]
+        tutorials = set(self._core_tutorials)
+        for number in changed[CORE]:
+            tutorials.discard(number)
+            if self._has_tutorial(self.core_groups.get(number, ())):
+                tutorials.add(number)
+        self._core_tutorials = sorted(tutorials)
+        for name in changed[ELECTIVE]:
+            self._elective_tutorials.pop(name, None)
+            if name in self.courses[ELECTIVE]:
+                self._elective_tutorials[name] = self._course_tutorials(name)
+        return changed
+
+    # Whether any of the rows is a tutorial or lab (T or P group)
+    def _has_tutorial(self, rows):
+        return any(self.schedule.group_kind(row) in ("T", "P") for row in rows)
+
+    def _course_tutorials(self, name):
+        return sorted(number for number, rows in self.course_groups(ELECTIVE, name)[1].items() if self._has_tutorial(rows))
+
+    # Lists computed from the whole schedule, which ScheduleCache can store between runs
+    def derived_lists(self):
+        return {
+            "core_tutorials": sorted(number for number, rows in self.core_groups.items() if self._has_tutorial(rows)),
+            "elective_tutorials": {name: self._course_tutorials(name) for name in self.courses[ELECTIVE]},
+        }
+
+    def core_tutorials(self):
+        return list(self._core_tutorials)
+
+    def course_names(self, course_type):
+        return sorted(self.courses[course_type])
+
+    def elective_tutorials(self, elective_name):
+        return list(self._elective_tutorials.get(elective_name, []))
+
+    # Rows of a course's lectures, and of each of its groups by group number
+    def course_groups(self, category, name):
+        lectures, groups = array("I"), {}
+        for row in self.courses[category].get(name, ()):
+            if self.schedule.name_tokens(row)[1]:
+                lectures.append(row)
+            else:
+                groups.setdefault(self.schedule.group_number(row), array("I")).append(row)
+        return lectures, groups
+
+    # Rows of every entry of a course, or of its lectures and one group only
+    def course_rows(self, category, name, group_number=None):
+        rows = self.courses[category].get(name, array("I"))
+        if group_number is None:
+            return rows
+        lectures, groups = self.course_groups(category, name)
+        return lectures + groups.get(group_number, array("I"))
+
+    # Rows of the core lectures a group attends: those with the source and course code of its tutorials and labs
+    def core_group_lectures(self, number):
+        keys = {self._lecture_key(row) for row in self.core_groups.get(number, ())}
+        rows = array("I")
+        for key in sorted(keys):
+            rows.extend(self.core_lectures.get(key, ()))
+        return rows
+
+    # Rows of the tutorials and labs of a core group, given by number or code (e.g., 009 or T009)
+    def core_group_rows(self, group):
+        rows = self.core_groups.get(group)
+        if rows is not None:
+            return rows
+        schedule = self.schedule
+        return array("I", [row for row in self.core_groups.get(group[1:], ()) if schedule.symbols[schedule.groups[row]] == group])
+
+    # Same parameters and result as filter_schedules
+    @profiler.timed("index filter")
+    def filter_schedules(self, core_filter=None, elective1=None, elective1_tut=None, elective2=None, elective2_tut=None, seminar=None):
+        filtered_schedule = {day: {slot: [] for slot in SLOTS} for day in DAYS}
+
+        schedule = self.schedule
+        hits = array("I")
+        for rows in self.core_lectures.values():  # Every core lecture is shown, as in filter_schedules
+            hits.extend(rows)
+        if core_filter is None:
+            for rows in self.core_groups.values():
+                hits.extend(rows)
+        else:
+            hits.extend(self.core_group_rows(core_filter))
+        for elective, tutorial in ((elective1, elective1_tut), (elective2, elective2_tut)):
+            if elective is not None:
+                group_number = None if tutorial is None or tutorial == "All" else tutorial
+                hits.extend(self.course_rows(ELECTIVE, elective, group_number))
+        if seminar is not None:
+            hits.extend(self.course_rows(SEMINAR, seminar))
+
+        if profiler.enabled:
+            profiler.count("entries scanned", len(hits))
+        rows = schedule.sort_rows(set(hits))  # The same course may be picked as both electives
+        cells = [filtered_schedule[day][slot] for day in DAYS for slot in SLOTS]
+        for cell, text in zip(map(schedule.cell_number, rows), schedule.cell_texts(rows)):
+            cells[cell].append(text)
+        return filtered_schedule
+
+
+# Bounded LRU cache in front of ScheduleIndex.filter_schedules. Results are read-only
+# views (mappings of tuples), so a caller can't corrupt what later lookups return.
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize", "version"])
+
+
+class FilterCache:
+    def __init__(self, index, maxsize=128):
+        self.index = index
+        self.maxsize = maxsize
+        self.version = 0  # bumped on every reload, and part of every key
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    # Switch to a reloaded schedule, dropping every cached result
+    def reload(self, index):
+        self.index = index
+        self.version += 1
+        self._results.clear()
+
+    def filter_schedules(self, core_filter=None, elective1=None, elective1_tut=None, elective2=None, elective2_tut=None, seminar=None):
+        key = (self.version, core_filter, elective1, elective1_tut, elective2, elective2_tut, seminar)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            if profiler.enabled:
+                profiler.count("filter cache hits")
+            self._results.move_to_end(key)
+            return result
+        self.misses += 1
+        filtered_schedule = self.index.filter_schedules(core_filter, elective1, elective1_tut, elective2, elective2_tut, seminar)
+        result = MappingProxyType({day: MappingProxyType({slot: tuple(entries) for slot, entries in slots.items()})
+                                   for day, slots in filtered_schedule.items()})
+        self._results[key] = result
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+        return result
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._results), self.version)
+
+
+# On-disk cache of parsed sources, keyed by a hash of each source's content.
+# Each file holds a header, a string table and fixed-size little-endian items,
+# and is memory-mapped when loaded.
+_CACHE_MAGIC = b"GUCS"
+_CACHE_VERSION = 2
+_CACHE_HEADER = struct.Struct("<4sHII")  # magic, version, number of strings, number of items
+
+
+def _default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "guc-schedule-customizer")
+
+
+class ScheduleCache:
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get("SCHEDULE_CACHE_DIR") or _default_cache_dir()
+        self.key = None  # combined key of the last ingested sources
+
+    # Hash of the parser version and the content of a source, or None for sources that can only be
+    # read once (files, iterators). Files are hashed a block at a time, so they are never held in memory whole.
+    @staticmethod
+    def source_key(source):
+        digest = hashlib.sha256(b"parser %d\n" % _PARSER_VERSION)
+        if isinstance(source, str):
+            digest.update(source.encode("utf-8"))
+        elif isinstance(source, os.PathLike):
+            with open(source, "rb") as f:
+                for block in iter(functools.partial(f.read, _CHUNK_SIZE), b""):
+                    digest.update(block)
+        else:
+            return None
+        return digest.hexdigest()
+
+    def _path(self, key, suffix):
+        return os.path.join(self.directory, key + suffix)
+
+    # Writes the header and string table, then lets write_items(f, string_ids) write the count items
+    def _write(self, path, strings, count, write_items):
+        string_ids = {string: i for i, string in enumerate(strings)}
+        blob = bytearray()
+        offsets = [0]
+        for string in strings:
+            blob += string.encode("utf-8")
+            offsets.append(len(blob))
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, _CACHE_VERSION, len(strings), count))
+                f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+                f.write(blob)
+                write_items(f, string_ids)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # A read-only or full cache directory only costs a re-parse next time
+
+    # Calls read(view, offset, strings, count) on the items of a cache file, or returns None if it is missing or stale
+    @staticmethod
+    def _read(path, read):
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    magic, version, n_strings, n_items = _CACHE_HEADER.unpack_from(view, 0)
+                    if magic != _CACHE_MAGIC or version != _CACHE_VERSION:
+                        return None
+                    offset = _CACHE_HEADER.size
+                    offsets = struct.unpack_from(f"<{n_strings + 1}I", view, offset)
+                    offset += 4 * (n_strings + 1)
+                    with view[offset:offset + offsets[-1]] as blob:
+                        text = str(blob, "utf-8")
+                        if len(text) == len(blob):  # ASCII, so the byte offsets are character offsets
+                            strings = [sys.intern(text[offsets[i]:offsets[i + 1]]) for i in range(n_strings)]
+                        else:
+                            strings = [sys.intern(str(blob[offsets[i]:offsets[i + 1]], "utf-8")) for i in range(n_strings)]
+                    return read(view, offset + offsets[-1], strings, n_items)
+        except (OSError, ValueError, IndexError, struct.error):
+            return None
+
+    # The columns are copied out of the mapping in one go each and the cells rebuilt from them, without parsing any text
+    @profiler.timed("cache load")
+    def load(self, key):
+        def read(view, offset, strings, count):
+            compact = CompactSchedule()
+            compact.symbols = SymbolTable(strings)
+            for column in compact.columns():
+                end = offset + count * column.itemsize
+                column.frombytes(view[offset:end])
+                offset = end
+            if sys.byteorder == "big":
+                for column in compact.columns():
+                    column.byteswap()
+            compact.sources = array("H", bytes(2 * count))
+            compact._fill_cells()
+            return compact
+        return self._read(self._path(key, ".sched"), read)
+
+    # The items are the columns of a CompactSchedule one after the other, with its symbol ids as they are;
+    # a schedule with rows replaced by set_cells is copied without them first, as load puts every row in a cell
+    def store(self, key, schedule):
+        if not isinstance(schedule, CompactSchedule) or schedule.entry_count() != len(schedule.days):
+            schedule = combine_schedules(schedule)
+
+        def write(f, ids):
+            for column in schedule.columns():
+                if sys.byteorder == "big":
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                f.write(column.tobytes())
+        self._write(self._path(key, ".sched"), list(schedule.symbols), schedule.entry_count(), write)
+
+    # Parse only the sources whose content is not cached yet; returns one schedule per source
+    def parse(self, sources, workers=None):
+        keys = [self.source_key(source) for source in sources]
+        parsed = [self.load(key) if key is not None else None for key in keys]
+        missing = [i for i, schedule in enumerate(parsed) if schedule is None]
+        for i, schedule in zip(missing, _parse_sources([sources[i] for i in missing], workers)):
+            parsed[i] = schedule
+            if keys[i] is not None:
+                self.store(keys[i], schedule)
+        self.key = None if None in keys else hashlib.sha256("".join(keys).encode("ascii")).hexdigest()
+        return parsed
+
+    # ScheduleIndex of the last ingested schedule, with its derived lists loaded from or saved to the cache
+    def index(self, schedule):
+        if self.key is None:
+            return ScheduleIndex(schedule)
+        path = self._path(self.key, ".lists")
+
+        # The items are u32 words: the core tutorials, then every elective and its tutorials, each list prefixed by its length
+        def read(view, offset, strings, count):
+            words = iter(struct.unpack_from(f"<{count}I", view, offset))
+            core_tutorials = [strings[next(words)] for _ in range(next(words))]
+            elective_tutorials = {}
+            for _ in range(next(words)):
+                name = strings[next(words)]
+                elective_tutorials[name] = [strings[next(words)] for _ in range(next(words))]
+            return {"core_tutorials": core_tutorials, "elective_tutorials": elective_tutorials}
+        derived = self._read(path, read)
+        if derived is not None:
+            return ScheduleIndex(schedule, derived)
+
+        index = ScheduleIndex(schedule)
+        derived = index.derived_lists()
+        strings = list(dict.fromkeys(derived["core_tutorials"] + [string for name, tutorials in derived["elective_tutorials"].items()
+                                                                   for string in [name] + tutorials]))
+        words_count = 2 + len(derived["core_tutorials"]) + sum(2 + len(tutorials) for tutorials in derived["elective_tutorials"].values())
+
+        def write(f, ids):
+            words = [len(derived["core_tutorials"])] + [ids[number] for number in derived["core_tutorials"]]
+            words.append(len(derived["elective_tutorials"]))
+            for name, tutorials in derived["elective_tutorials"].items():
+                words += [ids[name], len(tutorials)] + [ids[number] for number in tutorials]
+            f.write(struct.pack(f"<{len(words)}I", *words))
+        self._write(path, strings, words_count, write)
+        return index
+
+
+# Watches source files and patches the combined schedule and its index in place when one changes.
+# Only the changed file is parsed again, and only the cells whose entries differ are re-indexed.
+class SourceWatcher:
+    def __init__(self, paths, schedule, index):
+        self.paths = [Path(path) for path in paths]
+        self.schedule = schedule  # CompactSchedule combining the sources in this order
+        self.index = index
+        self.stamps = [self._stamp(path) for path in self.paths]
+        self.errors = {}  # path -> ScheduleParseError of a file whose current version is malformed
+
+    @staticmethod
+    def _stamp(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    # Check the files once. Returns the changed (day, slot) cells and what changed in them
+    # (see ScheduleIndex.update_rows), or no cells and None when nothing changed.
+    def poll(self):
+        removed, added, cells = [], [], set()
+        schedule = self.schedule
+        for i, path in enumerate(self.paths):
+            stamp = self._stamp(path)
+            if stamp is None or stamp == self.stamps[i]:
+                continue
+            try:
+                new = parse_data(path)
+            except ScheduleParseError as error:
+                # Kept as it is until the file changes again, rather than parsed again on every poll
+                self.stamps[i] = stamp
+                self.errors[path] = error
+                continue
+            except (OSError, UnicodeDecodeError):
+                continue  # Most likely caught mid-write, so try again on the next poll
+            self.stamps[i] = stamp
+            self.errors.pop(path, None)
+            changes = {}
+            for day in DAYS:
+                for slot in SLOTS:
+                    old = [schedule.fields(row) for row in schedule.rows(day, slot) if schedule.sources[row] == i]
+                    fields = [new.fields(row) for row in new.rows(day, slot)]
+                    if old != fields:
+                        changes[(day, slot)] = fields
+            cell_removed, cell_added = schedule.set_cells(changes, i)
+            removed += cell_removed
+            added += cell_added
+            cells.update(changes)
+        if not cells:
+            return cells, None
+        return cells, self.index.update_rows(removed, added)
+
+
+# Runs computations off the Tk mainloop on one worker thread, so the window never blocks.
+# Every submit supersedes the previous request: a request still queued is dropped and a running
+# one is asked to stop through the cancel event it was given, so the newest selection wins.
+# Results are handed back on the mainloop by polling a queue with after().
+class BackgroundWorker:
+    def __init__(self, root, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.generation = 0  # number of the newest request
+        self.delivered = 0  # number of the last request whose result reached the mainloop
+        self.cancel = threading.Event()
+        self.polling = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @property
+    def busy(self):
+        return self.delivered != self.generation
+
+    # Run work(cancel) on the worker thread, then on_done(result) or on_error(error) on the mainloop
+    def submit(self, work, on_done, on_error=None):
+        self.cancel.set()
+        self.cancel = threading.Event()
+        self.generation += 1
+        self.requests.put((self.generation, work, self.cancel, on_done, on_error))
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.poll_ms, self._poll)
+
+    def _run(self):
+        while True:
+            generation, work, cancel, on_done, on_error = self.requests.get()
+            if cancel.is_set():
+                continue  # Superseded before it started
+            try:
+                self.results.put((generation, work(cancel), None, on_done, on_error))
+            except Exception as error:
+                self.results.put((generation, None, error, on_done, on_error))
+
+    def _poll(self):
+        while True:
+            try:
+                generation, result, error, on_done, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation:
+                continue  # A newer request is pending, so this result is already stale
+            self.delivered = generation
+            if error is None:
+                on_done(result)
+            elif on_error is not None:
+                on_error(error)
+            else:
+                raise error
+        self.polling = self.busy
+        if self.polling:
+            self.root.after(self.poll_ms, self._poll)
+
+
+# Many candidate schedules side by side as mini-grids on one scrollable Canvas, in a window of
+# their own. Tiles are laid out in as many columns as fit and only the tiles in view are drawn:
+# every scroll draws the tiles coming into view and deletes the ones leaving it, so the number of
+# canvas items depends on the window size rather than on the number of candidates.
+class ComparisonView:
+    CELL_WIDTH = 24
+    CELL_HEIGHT = 14
+    TITLE_HEIGHT = 34
+    PADDING = 14
+    COLORS = {"group": "#0cb370", "lecture": "#9bd9bd", "free": "#f0f0f0"}
+
+    def __init__(self, root, candidates, on_pick=None):
+        _import_tkinter()
+        self.candidates = candidates  # RankedSchedules, best first
+        self.on_pick = on_pick
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Compare {len(candidates)} schedules")
+        self.tile_width = self.CELL_WIDTH * (len(SLOTS) + 1) + self.PADDING
+        self.tile_height = self.TITLE_HEIGHT + self.CELL_HEIGHT * (len(DAYS) + 1) + self.PADDING
+        self.columns = 0
+        self.drawn = set()  # candidates whose tiles are on the canvas
+
+        self.scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL)
+        self.canvas = tk.Canvas(self.window, background="white", width=4 * self.tile_width, height=3 * self.tile_height,
+                                yscrollcommand=self._scrolled)
+        self.scrollbar.config(command=self.canvas.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.layout(event.width))
+        self.canvas.bind("<Button-1>", self._clicked)
+        self.canvas.bind("<MouseWheel>", lambda event: self.canvas.yview_scroll(-1 if event.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda event: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda event: self.canvas.yview_scroll(1, "units"))
+        self.layout(4 * self.tile_width)
+
+    # Fit the tiles to the canvas width; everything is redrawn only when the number of columns changes
+    def layout(self, width):
+        columns = max(1, width // self.tile_width)
+        if columns != self.columns:
+            self.columns = columns
+            self.canvas.delete("tile")
+            self.drawn.clear()
+        rows = -(-len(self.candidates) // columns)
+        self.canvas.configure(scrollregion=(0, 0, columns * self.tile_width, rows * self.tile_height),
+                              yscrollincrement=self.tile_height // 4)
+        self.draw_visible()
+
+    def _scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+        self.draw_visible()
+
+    def draw_visible(self):
+        if not self.columns:
+            return  # Not laid out yet
+        top = int(self.canvas.canvasy(0))
+        bottom = top + max(self.canvas.winfo_height(), self.tile_height)
+        visible = set(range(top // self.tile_height * self.columns, min(len(self.candidates), (bottom // self.tile_height + 1) * self.columns)))
+        for n in self.drawn - visible:
+            self.canvas.delete(f"tile{n}")
+        for n in sorted(visible - self.drawn):
+            self._draw_tile(n)
+        self.drawn = visible
+        if profiler.enabled:
+            profiler.count("comparison tiles drawn", len(visible))
+
+    def _draw_tile(self, n):
+        candidate = self.candidates[n]
+        tags = ("tile", f"tile{n}")
+        x = n % self.columns * self.tile_width + self.PADDING // 2
+        y = n // self.columns * self.tile_height + self.PADDING // 2
+        combination = candidate.combination
+        picks = [combination.core_filter] + [f"{name} {tutorial}" if tutorial else name for name, tutorial in
+                                             ((combination.elective1, combination.elective1_tut), (combination.elective2, combination.elective2_tut)) if name]
+        if combination.seminar:
+            picks.append(combination.seminar)
+        self.canvas.create_text(x, y, anchor="nw", text=f"{n + 1}. cost {candidate.cost:g}", font=("Arial", 9, "bold"), tags=tags)
+        self.canvas.create_text(x, y + 14, anchor="nw", text=", ".join(pick for pick in picks if pick), font=("Arial", 7),
+                                width=self.tile_width - self.PADDING, tags=tags)
+        y += self.TITLE_HEIGHT
+        for j, slot in enumerate(SLOTS):
+            self.canvas.create_text(x + (j + 1.5) * self.CELL_WIDTH, y + self.CELL_HEIGHT / 2, text=slot.split()[-1], font=("Arial", 7), tags=tags)
+        for i, day in enumerate(DAYS):
+            top = y + (i + 1) * self.CELL_HEIGHT
+            self.canvas.create_text(x + self.CELL_WIDTH / 2, top + self.CELL_HEIGHT / 2, text=day[:2], font=("Arial", 7), tags=tags)
+            for j, slot in enumerate(SLOTS):
+                entries = candidate.schedule.get(day, {}).get(slot, ())
+                if any(not text.startswith("L") for text in entries):
+                    color = self.COLORS["group"]
+                else:
+                    color = self.COLORS["lecture"] if entries else self.COLORS["free"]
+                left = x + (j + 1) * self.CELL_WIDTH
+                self.canvas.create_rectangle(left, top, left + self.CELL_WIDTH - 2, top + self.CELL_HEIGHT - 2, fill=color, outline="", tags=tags)
+
+    def _clicked(self, event):
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        column = int(x // self.tile_width)
+        n = int(y // self.tile_height) * self.columns + column
+        if self.on_pick is not None and column < self.columns and 0 <= n < len(self.candidates):
+            self.on_pick(self.candidates[n].combination)
+
+
+# tkinter is only imported once the GUI starts, so headless use works where Tk isn't installed
+def _import_tkinter():
+    global tk, ttk, font
+    import tkinter as tk
+    from tkinter import ttk, font
+
+
 # GUI Application
 class ScheduleApp:
-    def __init__(self, root):
+    NO_SCHEDULE_LEFT = "No clash-free schedule left, undo a pick"
+
+    def __init__(self, root, sources=None, use_cache=True, watch_interval=None):
+        _import_tkinter()
         self.root = root
         self.root.title("University Schedule Explorer")
-        if len(data) == 0:
-            raise ValueError("No data provided")
-        
-        self.schedule = parse_data(data[0])
-        for i in range(1, len(data)):
-            self.schedule = combine_schedules(self.schedule, parse_data(data[i]))
-        self.core_tutorials = extract_core_tutorials(self.schedule)
-        self.elective_courses = extract_course_names(self.schedule, "elective")
-        self.seminar_courses = extract_course_names(self.schedule, "seminar")
+        sources = data if sources is None else sources
+        self.cache = ScheduleCache() if use_cache else None
+        self.schedule = ingest(sources, cache=self.cache)
+        self.index = self.cache.index(self.schedule) if use_cache else ScheduleIndex(self.schedule)
+        self.filter_cache = FilterCache(self.index)
+        self.solver = CombinationSolver(self.index)
+        self.compatibility = CompatibilityMatrix(self.solver)
+        self.applied_filters = None  # filters of the table currently shown
+        self.core_tutorials = self.index.core_tutorials()
+        self.elective_courses = self.index.course_names(ELECTIVE)
+        self.seminar_courses = self.index.course_names(SEMINAR)
         self.font_size = 10  # Default font size
         self.label_font = font.Font(size=14)
+        # Shared fonts of the table, so changing the size is one reconfigure per font
+        self.cell_font = font.Font(family="Arial", size=self.font_size)
+        self.bold_font = font.Font(family="Arial", size=self.font_size, weight="bold")
+        self.day_font = font.Font(family="Arial", size=self.font_size + 5, weight="bold")
 
         # UI Components
         self.core_filter = tk.StringVar(value="None")
@@ -138,27 +1234,41 @@ class ScheduleApp:
         self.elective2_tut = tk.StringVar(value="All")
         self.seminar = tk.StringVar(value="None")
 
+        self.propagator = None  # ChoicePropagator of what-if mode, built when it is first turned on
         self.create_widgets()
+        self.worker = BackgroundWorker(self.root)
+        self.compare_count = 60  # candidates shown by Compare
+
+        # Watch mode: poll the source files and patch the open schedule when one changes
+        self.watcher = None
+        self.reload_failed = False  # whether the status shows a source that didn't parse
+        if watch_interval is not None:
+            self.watcher = SourceWatcher(sources, self.schedule, self.index)
+            self.root.after(int(watch_interval * 1000), self.poll_sources, watch_interval)
 
     def create_widgets(self):
         # Dropdowns and Button
         ttk.Label(self.root, text="Core Filter:", font=self.label_font).grid(row=0, column=0, padx=5, pady=5)
-        ttk.Combobox(self.root, textvariable=self.core_filter, values=["None"] + self.core_tutorials, font=self.label_font).grid(row=0, column=1, padx=5, pady=5)
+        self.core_dropdown = ttk.Combobox(self.root, textvariable=self.core_filter, values=["None"] + self.core_tutorials, font=self.label_font)
+        self.core_dropdown.grid(row=0, column=1, padx=5, pady=5)
 
         ttk.Label(self.root, text="Elective 1:", font=self.label_font).grid(row=0, column=2, padx=5, pady=5)
-        ttk.Combobox(self.root, textvariable=self.elective1, values=["None"] + self.elective_courses, state="readonly", font=self.label_font).grid(row=0, column=3, padx=5, pady=5)
+        self.elective1_dropdown = ttk.Combobox(self.root, textvariable=self.elective1, values=["None"] + self.elective_courses, state="readonly", font=self.label_font)
+        self.elective1_dropdown.grid(row=0, column=3, padx=5, pady=5)
         ttk.Label(self.root, text="Tutorial:", font=self.label_font).grid(row=0, column=4, padx=5, pady=5)
         self.elective1_tut_dropdown = ttk.Combobox(self.root, textvariable=self.elective1_tut, values=["All"], state="readonly", font=self.label_font)
         self.elective1_tut_dropdown.grid(row=0, column=5, padx=5, pady=5)
 
         ttk.Label(self.root, text="Elective 2:", font=self.label_font).grid(row=1, column=1, padx=5, pady=5)
-        ttk.Combobox(self.root, textvariable=self.elective2, values=["None"] + self.elective_courses, state="readonly", font=self.label_font).grid(row=1, column=2, padx=5, pady=5)
+        self.elective2_dropdown = ttk.Combobox(self.root, textvariable=self.elective2, values=["None"] + self.elective_courses, state="readonly", font=self.label_font)
+        self.elective2_dropdown.grid(row=1, column=2, padx=5, pady=5)
         ttk.Label(self.root, text="Tutorial:").grid(row=1, column=3, padx=5, pady=5)
         self.elective2_tut_dropdown = ttk.Combobox(self.root, textvariable=self.elective2_tut, values=["All"], state="readonly", font=self.label_font)
         self.elective2_tut_dropdown.grid(row=1, column=4, padx=5, pady=5)
 
         ttk.Label(self.root, text="Seminar:", font=self.label_font).grid(row=1, column=5, padx=5, pady=5)
-        ttk.Combobox(self.root, textvariable=self.seminar, values=["None"] + self.seminar_courses, state="readonly", font=self.label_font).grid(row=1, column=6, padx=5, pady=5)
+        self.seminar_dropdown = ttk.Combobox(self.root, textvariable=self.seminar, values=["None"] + self.seminar_courses, state="readonly", font=self.label_font)
+        self.seminar_dropdown.grid(row=1, column=6, padx=5, pady=5)
 
         # Create a style object
         style = ttk.Style()
@@ -170,6 +1280,19 @@ class ScheduleApp:
           background=[("active", "#0a8f5c")],  # Hover background color
           foreground=[("active", "#d1d1d1")])  # Hover foreground color
         ttk.Button(self.root, text="Apply Filters", command=self.update_table, style="Custom.TButton").grid(row=2, column=6, padx=5, pady=5)
+        ttk.Button(self.root, text="Best Schedule", command=self.find_best_schedule).grid(row=2, column=5, padx=5, pady=5)
+        ttk.Button(self.root, text="Compare", command=self.compare_schedules).grid(row=1, column=0, padx=5, pady=5)
+
+        # What-if mode: every pick is pinned and only options that fit with some option of every other choice are offered
+        self.what_if = tk.BooleanVar(value=False)
+        ttk.Checkbutton(self.root, text="What-if", variable=self.what_if, command=self.update_compatible_options).grid(row=0, column=6, padx=5, pady=5)
+        ttk.Button(self.root, text="Undo", command=self.undo_pin).grid(row=0, column=7, padx=5, pady=5)
+
+        # Progress of the filtering or search running in the background
+        self.status = tk.StringVar(value="")
+        self.progress = ttk.Progressbar(self.root, mode="indeterminate", length=120)
+        self.progress.grid(row=2, column=0, padx=5, pady=5)
+        ttk.Label(self.root, textvariable=self.status).grid(row=2, column=1, padx=5, pady=5)
 
         # Font Size Controller
         ttk.Label(self.root, text="Font Size:").grid(row=2, column=2, padx=5, pady=5)
@@ -187,14 +1310,17 @@ class ScheduleApp:
 
         # Create a grid of Text widgets for the table
         self.text_widgets = {}
-        days = ["Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
-        for i, day in enumerate(["Day", "Slot 1", "Slot 2", "Slot 3", "Slot 4", "Slot 5"]):
+        self.rendered = {}  # (row, column) -> lines currently shown in that cell, as (text, tag) pairs
+        for i, day in enumerate(["Day"] + SLOTS):
             self.table_frame.grid_columnconfigure(i, weight=1)
             label = ttk.Label(self.table_frame, text=day, font=("Arial", 11, "bold"))
             label.grid(row=0, column=i, sticky="nsew")
-            for j, day_name in enumerate(days):
+            for j, day_name in enumerate(DAYS):
                 self.table_frame.grid_rowconfigure(j + 1, weight=1)
-                text = tk.Text(self.table_frame, width=20, height=5, wrap=tk.WORD, font=("Arial", self.font_size))
+                text = tk.Text(self.table_frame, width=20, height=5, wrap=tk.WORD, font=self.cell_font)
+                text.tag_configure("regular", font=self.cell_font)
+                text.tag_configure("bold", font=self.bold_font)
+                text.tag_configure("boldy", font=self.day_font)
                 text.grid(row=j + 1, column=i, sticky="nsew")
                 text.config(state=tk.DISABLED)  # Make it read-only
                 self.text_widgets[(j + 1, i)] = text
@@ -202,37 +1328,105 @@ class ScheduleApp:
         # Bind elective dropdowns to update tutorial dropdowns
         self.elective1.trace_add("write", self.update_elective1_tutorials)
         self.elective2.trace_add("write", self.update_elective2_tutorials)
+        # Any other pick narrows the remaining dropdowns to options that don't clash with it
+        for variable in (self.core_filter, self.elective1_tut, self.elective2_tut, self.seminar):
+            variable.trace_add("write", self.update_compatible_options)
 
+    # Picking an elective resets its tutorial, whose write trace then refreshes the options
     def update_elective1_tutorials(self, *args):
-        elective_name = self.elective1.get()
-        if elective_name == "None":
-            self.elective1_tut_dropdown["values"] = ["All"]
-            self.elective1_tut.set("All")
-        else:
-            tutorials = extract_elective_tutorials(self.schedule, elective_name)
-            self.elective1_tut_dropdown["values"] = ["All"] + tutorials
-            self.elective1_tut.set("All")
+        self.elective1_tut.set("All")
 
     def update_elective2_tutorials(self, *args):
-        elective_name = self.elective2.get()
+        self.elective2_tut.set("All")
+
+    # Compatibility matrix keys of a picked elective: its lectures until a tutorial is picked
+    def _elective_keys(self, elective, tutorial):
+        if elective.get() == "None":
+            return []
+        return [(ELECTIVE, elective.get(), None if tutorial.get() == "All" else tutorial.get())]
+
+    def _compatible_tutorials(self, selected, elective_name):
         if elective_name == "None":
-            self.elective2_tut_dropdown["values"] = ["All"]
-            self.elective2_tut.set("All")
+            return []
+        return [tutorial for tutorial in self.compatibility.compatible_tutorials(selected, elective_name) if tutorial is not None]
+
+    def update_compatible_options(self, *args):
+        if self.what_if.get():
+            self.update_pinned_options()
+            return
+        if self.status.get() == self.NO_SCHEDULE_LEFT:
+            self.status.set("")
+        self.core_dropdown["values"] = ["None"] + self.core_tutorials  # What-if mode may have narrowed it
+        core = [(CORE, self.core_filter.get(), None)]  # "None" or an unknown group has no row and is ignored
+        elective1 = self._elective_keys(self.elective1, self.elective1_tut)
+        elective2 = self._elective_keys(self.elective2, self.elective2_tut)
+        self.elective1_dropdown["values"] = ["None"] + self.compatibility.compatible_courses(core, ELECTIVE)
+        self.elective1_tut_dropdown["values"] = ["All"] + self._compatible_tutorials(core, self.elective1.get())
+        self.elective2_dropdown["values"] = ["None"] + self.compatibility.compatible_courses(core + elective1, ELECTIVE)
+        self.elective2_tut_dropdown["values"] = ["All"] + self._compatible_tutorials(core + elective1, self.elective2.get())
+        self.seminar_dropdown["values"] = ["None"] + self.compatibility.compatible_courses(core + elective1 + elective2, SEMINAR)
+
+    # Pins for the current picks, as (label, variable, rows) in the order they are pinned
+    def _wanted_pins(self):
+        rows = self.compatibility.rows
+        pins = []
+        if (CORE, self.core_filter.get(), None) in rows:
+            pins.append((("core", self.core_filter.get()), "core", {rows[(CORE, self.core_filter.get(), None)]}))
+        for variable, elective, tutorial in (("elective1", self.elective1, self.elective1_tut), ("elective2", self.elective2, self.elective2_tut)):
+            options = self.solver.elective_options.get(elective.get())
+            if options is None:
+                continue
+            pins.append(((variable, elective.get()), variable, {rows[(ELECTIVE, elective.get(), option)] for option, _ in options}))
+            if (ELECTIVE, elective.get(), tutorial.get()) in rows and tutorial.get() != "All":
+                pins.append(((variable, elective.get(), tutorial.get()), variable, {rows[(ELECTIVE, elective.get(), tutorial.get())]}))
+        if (SEMINAR, self.seminar.get(), None) in rows:
+            pins.append((("seminar", self.seminar.get()), "seminar", {rows[(SEMINAR, self.seminar.get(), None)]}))
+        return pins
+
+    # Bring the pins in line with the picks, undoing only from the first pin that no longer holds,
+    # then offer what is left of each domain in the dropdowns
+    def update_pinned_options(self):
+        if self.propagator is None:
+            self.propagator = ChoicePropagator(self.compatibility)
+        propagator = self.propagator
+        wanted = self._wanted_pins()
+        labels = {label for label, _, _ in wanted}
+        kept = 0
+        while kept < len(propagator.pins) and propagator.pins[kept][0] in labels:
+            kept += 1
+        while len(propagator.pins) > kept:
+            propagator.undo()
+        pinned = {label for label, _, _ in propagator.pins}
+        for label, variable, rows in wanted:
+            if label not in pinned:
+                propagator.pin(label, variable, rows)
+
+        self.core_dropdown["values"] = ["None"] + [number for _, number, _ in propagator.values("core")]
+        for variable, elective, dropdown, tutorial_dropdown in (("elective1", self.elective1, self.elective1_dropdown, self.elective1_tut_dropdown),
+                                                                ("elective2", self.elective2, self.elective2_dropdown, self.elective2_tut_dropdown)):
+            values = propagator.values(variable)
+            dropdown["values"] = ["None"] + list(dict.fromkeys(name for _, name, _ in values))
+            tutorial_dropdown["values"] = ["All"] + [tutorial for _, name, tutorial in values if name == elective.get() and tutorial is not None]
+        self.seminar_dropdown["values"] = ["None"] + [name for _, name, _ in propagator.values("seminar")]
+        self.status.set("" if propagator.consistent else self.NO_SCHEDULE_LEFT)
+
+    # Take back the last pick made in what-if mode
+    def undo_pin(self):
+        if not self.what_if.get() or self.propagator is None or not self.propagator.pins:
+            return
+        label = self.propagator.undo()
+        variable = {"core": self.core_filter, "seminar": self.seminar}.get(label[0])
+        if variable is not None:
+            variable.set("None")
+        elif len(label) == 3:
+            (self.elective1_tut if label[0] == "elective1" else self.elective2_tut).set("All")
         else:
-            tutorials = extract_elective_tutorials(self.schedule, elective_name)
-            self.elective2_tut_dropdown["values"] = ["All"] + tutorials
-            self.elective2_tut.set("All")
+            # Picking "None" resets the tutorial too, whose pin (if any) was undone before this one
+            (self.elective1 if label[0] == "elective1" else self.elective2).set("None")
 
     def update_table(self):
-        # Clear the table
-        for widget in self.text_widgets.values():
-            widget.config(state=tk.NORMAL)
-            widget.delete(1.0, tk.END)
-            widget.config(state=tk.DISABLED)
-
         # Apply filters
-        filtered_schedule = filter_schedules(
-            self.schedule,
+        self.applied_filters = dict(
             core_filter=self.core_filter.get() if self.core_filter.get() != "None" else None,
             elective1=self.elective1.get() if self.elective1.get() != "None" else None,
             elective1_tut=self.elective1_tut.get() if self.elective1_tut.get() != "None" else None,
@@ -240,35 +1434,128 @@ class ScheduleApp:
             elective2_tut=self.elective2_tut.get() if self.elective2_tut.get() != "None" else None,
             seminar=self.seminar.get() if self.seminar.get() != "None" else None
         )
+        filters = self.applied_filters
+        self.run_in_background("Filtering...", lambda cancel: self.filter_cache.filter_schedules(**filters), self.render_table)
+
+    # Run work(cancel) on the worker thread, showing progress until on_done gets its result
+    def run_in_background(self, message, work, on_done):
+        self.status.set(message)
+        self.progress.start(10)
+
+        def done(result):
+            self.progress.stop()
+            self.status.set("")
+            on_done(result)
+
+        def failed(error):
+            self.progress.stop()
+            self.status.set(f"Failed: {error}")
+        self.worker.submit(work, done, failed)
+
+    # The best k clash-free schedules that keep the picked courses and only vary their unpicked
+    # tutorial groups, ranked by fewest campus days and then fewest idle slots
+    def _best_schedules(self, k):
+        core = self.core_filter.get()
+        electives = [name for name in (self.elective1.get(), self.elective2.get()) if name != "None"]
+        tutorials = {elective.get(): [tutorial.get()] for elective, tutorial in ((self.elective1, self.elective1_tut), (self.elective2, self.elective2_tut))
+                     if elective.get() != "None" and tutorial.get() != "All"}
+        seminar = self.seminar.get()
+        objective = Weighted({CampusDays(): 10, IdleSlots(): 1})
+        return lambda cancel: self.solver.best(k, objective, core_groups=None if core == "None" else [core], electives=electives,
+                                               n_electives=len(electives), seminars=[] if seminar == "None" else [seminar],
+                                               elective_tutorials=tutorials, cancel=cancel)
 
+    # Show a combination of groups in the dropdowns and the table
+    def pick_combination(self, combination):
+        self.core_filter.set(combination.core_filter or "None")
+        # Setting an elective resets its tutorial, so each tutorial is set after its elective
+        self.elective1.set(combination.elective1 or "None")
+        self.elective1_tut.set(combination.elective1_tut or "All")
+        self.elective2.set(combination.elective2 or "None")
+        self.elective2_tut.set(combination.elective2_tut or "All")
+        self.seminar.set(combination.seminar or "None")
+        self.update_table()
+
+    def find_best_schedule(self):
+        def show(results):
+            if results:
+                self.pick_combination(results[0].combination)
+            else:
+                self.status.set("No clash-free schedule")
+        self.run_in_background("Searching...", self._best_schedules(1), show)
+
+    # Open the best candidates side by side; clicking one picks it in the main window
+    def compare_schedules(self):
+        def show(results):
+            if results:
+                ComparisonView(self.root, results, self.pick_combination)
+            else:
+                self.status.set("No clash-free schedule")
+        self.run_in_background("Searching...", self._best_schedules(self.compare_count), show)
+
+    @profiler.timed("render")
+    def render_table(self, filtered_schedule):
         self.apply_font_size()
         # Populate the table
-        days = ["Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
-        for i, day in enumerate(days):
-            self.text_widgets[(i + 1, 0)].config(state=tk.NORMAL)
-            self.text_widgets[(i + 1, 0)].delete("1.0", tk.END)  # Clear existing text
-            self.text_widgets[(i + 1, 0)].insert(tk.END, day, "boldy")
-            for j, slot in enumerate(["Slot 1", "Slot 2", "Slot 3", "Slot 4", "Slot 5"]):
-                self.text_widgets[(i + 1, j + 1)].config(state=tk.NORMAL)
-                entries = filtered_schedule[day][slot]
-                for entry in entries:
-                    if "Lecture" in entry and "-EL" not in entry and "-Seminar" not in entry:
-                        self.text_widgets[(i + 1, j + 1)].insert(tk.END, entry + "\n", "regular")
-                    else:
-                        self.text_widgets[(i + 1, j + 1)].insert(tk.END, entry + "\n", "bold")
-                self.text_widgets[(i + 1, j + 1)].config(state=tk.DISABLED)
+        for i, day in enumerate(DAYS):
+            self.render_cell((i + 1, 0), ((day, "boldy"),))
+            for j, slot in enumerate(SLOTS):
+                lines = tuple((entry + "\n", "regular" if "Lecture" in entry else "bold") for entry in filtered_schedule[day][slot])
+                self.render_cell((i + 1, j + 1), lines)
 
-        self.apply_font_size()
+    # Patch the schedule from changed source files, then repaint the cells whose content changed
+    def poll_sources(self, interval):
+        if self.worker.busy:
+            # The worker reads the index, so only patch it in between requests
+            self.root.after(int(interval * 1000), self.poll_sources, interval)
+            return
+        cells, changed = self.watcher.poll()
+        if self.watcher.errors:
+            path, error = next(iter(self.watcher.errors.items()))
+            errors = [diagnostic for diagnostic in error.diagnostics if diagnostic.severity == "error"]
+            self.status.set(f"{path.name} not reloaded, {len(errors)} errors, first at line {errors[0].line}: {errors[0].message}")
+            self.reload_failed = True
+        elif self.reload_failed:
+            self.status.set("")
+            self.reload_failed = False
+        if changed is not None:
+            self.solver.update(changed)
+            self.compatibility.update(changed)
+            self.propagator = None  # Rebuilt with the picks pinned again by update_compatible_options
+            self.filter_cache.reload(self.index)
+            self.core_tutorials = self.index.core_tutorials()
+            self.elective_courses = self.index.course_names(ELECTIVE)
+            self.seminar_courses = self.index.course_names(SEMINAR)
+            self.core_dropdown["values"] = ["None"] + self.core_tutorials
+            self.update_compatible_options()
+            if self.applied_filters is not None:
+                self.render_table(self.filter_cache.filter_schedules(**self.applied_filters))
+        self.root.after(int(interval * 1000), self.poll_sources, interval)
 
-    def apply_font_size(self):
-        # Update font size for all text widgets
-        self.font_size = self.font_size_var.get()
-        for widget in self.text_widgets.values():
-            widget.config(font=("Arial", self.font_size))
-            widget.tag_configure("regular", font=("Arial", self.font_size))
-            widget.tag_configure("bold", font=("Arial", self.font_size, "bold"))
-            widget.tag_configure("boldy", font=("Arial", self.font_size+5, "bold"))
+    # Replace the content of a cell, only touching the widget when it changed since the last render
+    def render_cell(self, cell, lines):
+        if self.rendered.get(cell, ()) == lines:
+            return
+        widget = self.text_widgets[cell]
+        widget.config(state=tk.NORMAL)
+        widget.delete("1.0", tk.END)
+        for text, tag in lines:
+            widget.insert(tk.END, text, tag)
+        widget.config(state=tk.DISABLED)
+        self.rendered[cell] = lines
+        if profiler.enabled:
+            profiler.count("cells repainted")
 
+    @profiler.timed("font")
+    def apply_font_size(self):
+        # Update the shared fonts, which every text widget and tag uses
+        font_size = self.font_size_var.get()
+        if font_size == self.font_size:
+            return
+        self.font_size = font_size
+        self.cell_font.configure(size=self.font_size)
+        self.bold_font.configure(size=self.font_size)
+        self.day_font.configure(size=self.font_size + 5)
 
 
 data = ["""
@@ -594,8 +1881,308 @@ Free
 ]
 
 
+# Write a filtered timetable as plain text, JSON or CSV
+def write_schedule(filtered_schedule, output_format, out):
+    if output_format == "json":
+        json.dump({day: {slot: list(entries) for slot, entries in slots.items()} for day, slots in filtered_schedule.items()}, out, indent=2)
+        out.write("\n")
+    elif output_format == "csv":
+        writer = csv.writer(out)
+        writer.writerow(["day", "slot", "entry"])
+        for day, slots in filtered_schedule.items():
+            for slot, entries in slots.items():
+                for entry in entries:
+                    writer.writerow([day, slot, entry])
+    else:
+        for day, slots in filtered_schedule.items():
+            out.write(f"{day}\n")
+            for slot, entries in slots.items():
+                out.write(f"  {slot}: {'; '.join(entries) if entries else 'Free'}\n")
+
+
+def _load_schedule(args, cache=None):
+    sources = [sys.stdin if source == "-" else Path(source) for source in args.sources] or data
+    return ingest(sources, workers=args.workers, cache=cache)
+
+
+def _load_index(args):
+    if args.no_cache:
+        return ScheduleIndex(_load_schedule(args))
+    cache = ScheduleCache()
+    return cache.index(_load_schedule(args, cache))
+
+
+def _command_gui(args):
+    _import_tkinter()
+    sources = [Path(source) for source in args.sources] or None
+    if args.watch and sources is None:
+        raise SystemExit("--watch needs timetable files to watch")
+    if args.watch_interval <= 0:
+        raise SystemExit("--watch-interval must be positive")
+    root = tk.Tk()
+    ScheduleApp(root, sources, use_cache=not args.no_cache, watch_interval=args.watch_interval if args.watch else None)  # Kept alive by the callbacks it binds on root
+    root.mainloop()
+
+
+def _command_filter(args):
+    index = _load_index(args)
+    filtered_schedule = index.filter_schedules(args.core, args.elective1, args.elective1_tut, args.elective2, args.elective2_tut, args.seminar)
+    write_schedule(filtered_schedule, args.format, sys.stdout)
+
+
+def _command_list(args):
+    index = _load_index(args)
+    if args.what == "core":
+        values = index.core_tutorials()
+    elif args.what == "tutorials":
+        if args.elective is None:
+            raise SystemExit("list tutorials needs --elective")
+        values = index.elective_tutorials(args.elective)
+    else:
+        values = index.course_names(ELECTIVE if args.what == "electives" else SEMINAR)
+    if args.format == "json":
+        json.dump(values, sys.stdout)
+        sys.stdout.write("\n")
+    else:
+        sys.stdout.writelines(f"{value}\n" for value in values)
+
+
+def _command_search(args):
+    solver = CombinationSolver(_load_index(args))
+    filters = dict(core_groups=args.core, electives=args.electives, n_electives=args.n_electives,
+                   seminars=[] if args.no_seminar else args.seminars)
+    if args.rank is None:
+        combinations = solver.search(**filters)
+        if args.format == "csv":
+            writer = csv.writer(sys.stdout)
+            writer.writerow(Combination._fields)
+        for n, combination in enumerate(combinations):
+            if args.top is not None and n == args.top:
+                break
+            if args.format == "json":
+                sys.stdout.write(json.dumps(combination._asdict()) + "\n")
+            elif args.format == "csv":
+                writer.writerow(["" if value is None else value for value in combination])
+            else:
+                sys.stdout.write(" | ".join(f"{field}={value}" for field, value in combination._asdict().items() if value is not None) + "\n")
+        return
+
+    ranked = solver.best(args.top or 10, args.rank, **filters)
+    if args.format == "json":
+        json.dump([{"cost": result.cost, "combination": result.combination._asdict(), "schedule": result.schedule} for result in ranked], sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["cost"] + list(Combination._fields))
+        for result in ranked:
+            writer.writerow([result.cost] + ["" if value is None else value for value in result.combination])
+    else:
+        for result in ranked:
+            sys.stdout.write(f"# cost {result.cost:g}: " + ", ".join(f"{field}={value}" for field, value in result.combination._asdict().items() if value is not None) + "\n")
+            write_schedule(result.schedule, "text", sys.stdout)
+            sys.stdout.write("\n")
+
+
+def _command_batch(args):
+    import batch
+    skipped, solved = batch.run(_load_index(args), args.preferences, args.output, args.workers, args.rank, args.top,
+                                args.chunk_size, args.schedules)
+    print(f"Solved {solved} students ({skipped} already in {args.output})", file=sys.stderr)
+
+
+def _command_swaps(args):
+    import swap
+    matcher, groups, errors = swap.match_requests(CombinationSolver(_load_index(args)), args.requests)
+    for student, error in errors:
+        print(f"Skipped {student}: {error}", file=sys.stderr)
+    if args.format == "json":
+        json.dump([[move._asdict() for move in moves] for moves in groups], sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    elif args.format == "csv":
+        writer = csv.writer(sys.stdout)
+        writer.writerow(["swap"] + list(swap.Move._fields))
+        for n, moves in enumerate(groups, 1):
+            writer.writerows([n] + list(move) for move in moves)
+    else:
+        for moves in groups:
+            sys.stdout.write(("swap: " if len(moves) == 2 else f"cycle of {len(moves)}: ")
+                             + ", ".join(f"{move.student} {move.course} {move.current}->{move.target}" for move in moves) + "\n")
+    moved = sum(len(moves) for moves in groups)
+    print(f"Moved {moved} of {len(matcher.requests)} students in {len(groups)} swaps and cycles "
+          f"({matcher.infeasible} wanted groups would clash)", file=sys.stderr)
+
+
+def _command_export(args):
+    import export
+    timetables = export.GroupTimetables(_load_schedule(args, None if args.no_cache else ScheduleCache()))
+    paths = timetables.export(args.output, args.formats, args.term_start, args.weeks)
+    print(f"Wrote {len(paths)} files for {len(timetables.numbers)} groups to {args.output}", file=sys.stderr)
+
+
+def _command_rooms(args):
+    import rooms
+    room_index = rooms.RoomIndex(_load_schedule(args, None if args.no_cache else ScheduleCache()))
+    if args.what == "usage":
+        usage = room_index.utilization(args.by_building, args.building, args.kind)
+        if args.format == "json":
+            json.dump([row._asdict() for row in usage], sys.stdout, indent=2)
+            sys.stdout.write("\n")
+        elif args.format == "csv":
+            writer = csv.writer(sys.stdout)
+            writer.writerow(rooms.Usage._fields)
+            writer.writerows(usage)
+        else:
+            sys.stdout.writelines(f"{row.name:<10} {row.utilization:6.1%}  {row.occupied}/{row.cells} slots"
+                                  + (f" in {row.rooms} rooms" if args.by_building else "") + "\n" for row in usage)
+        return
+    if args.day is None or args.slot is None:
+        raise SystemExit(f"rooms {args.what} needs --day and --slot")
+    day = args.day.capitalize()
+    slot = args.slot if args.slot.startswith("Slot") else f"Slot {args.slot}"
+    if (day, slot) not in room_index.occupied:
+        raise SystemExit(f"no {slot} on {day} in the schedule")
+    names = (room_index.free if args.what == "free" else room_index.busy)(day, slot, args.building, args.kind)
+    if args.format == "json":
+        json.dump(names, sys.stdout)
+        sys.stdout.write("\n")
+    else:
+        sys.stdout.writelines(f"{name}\n" for name in names)
+
+
+def _command_check(args):
+    errors = 0
+    for source in args.sources:
+        diagnostics = []
+        parse_data(sys.stdin if source == "-" else Path(source), diagnostics)
+        for diagnostic in diagnostics:
+            print(f"{source}:{diagnostic.line}: {diagnostic.severity}: {diagnostic.message}" + (f": {diagnostic.text!r}" if diagnostic.text else ""))
+            errors += diagnostic.severity == "error"
+    if errors:
+        raise SystemExit(1)
+
+
+def _command_serve(args):
+    import server
+    server.run(_load_index(args), args.host, args.port)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Explore GUC schedules by tutorial group, electives and seminar.")
+    commands = parser.add_subparsers(dest="command")
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--workers", type=int, help="processes used to parse several sources or solve a batch")
+    common.add_argument("--no-cache", action="store_true", help="don't read or write the parsed schedule cache")
+    common.add_argument("--profile", action="store_true", help="print time and counters per phase at exit")
+    common.add_argument("--trace", metavar="PATH", help="also write a Chrome trace of the phases to PATH")
+    formats = argparse.ArgumentParser(add_help=False)
+    formats.add_argument("--format", choices=["text", "json", "csv"], default="text")
+
+    gui = commands.add_parser("gui", parents=[common], help="open the schedule explorer window (default)")
+    gui.add_argument("--watch", action="store_true", help="reload changed source files while open")
+    gui.add_argument("--watch-interval", type=float, default=2.0, metavar="SECONDS",
+                     help="seconds between checks of the watched files (default: 2)")
+    gui.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data)")
+    gui.set_defaults(handler=_command_gui)
+
+    filter_parser = commands.add_parser("filter", parents=[common, formats], help="print a filtered timetable")
+    filter_parser.add_argument("--core", help="core tutorial group number, e.g. 009")
+    filter_parser.add_argument("--elective1")
+    filter_parser.add_argument("--elective1-tut")
+    filter_parser.add_argument("--elective2")
+    filter_parser.add_argument("--elective2-tut")
+    filter_parser.add_argument("--seminar")
+    filter_parser.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data, - for stdin)")
+    filter_parser.set_defaults(handler=_command_filter)
+
+    list_parser = commands.add_parser("list", parents=[common, formats], help="list core groups, electives, seminars or elective tutorials")
+    list_parser.add_argument("what", choices=["core", "electives", "seminars", "tutorials"])
+    list_parser.add_argument("--elective", help="elective whose tutorials are listed")
+    list_parser.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data, - for stdin)")
+    list_parser.set_defaults(handler=_command_list)
+
+    search = commands.add_parser("search", parents=[common, formats], help="find clash-free combinations")
+    search.add_argument("--core", nargs="+", help="candidate core groups (default: all)")
+    search.add_argument("--electives", nargs="+", help="candidate electives (default: all)")
+    search.add_argument("--n-electives", type=int, default=2, choices=[0, 1, 2])
+    search.add_argument("--seminars", nargs="+", help="candidate seminars (default: all)")
+    search.add_argument("--no-seminar", action="store_true", help="leave the seminar out")
+    search.add_argument("--rank", type=parse_objective, help="rank by objectives, e.g. days or days=10,idle=1 (days, idle, late, no-thursday)")
+    search.add_argument("--top", type=int, help="number of results (default: all, or 10 when ranking)")
+    search.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data, - for stdin)")
+    search.set_defaults(handler=_command_search)
+
+    batch = commands.add_parser("batch", parents=[common], help="find the best schedule of every student in a preferences file")
+    batch.add_argument("preferences", help="one student per row of a .csv or line of a .jsonl file (see batch.read_preference)")
+    batch.add_argument("-o", "--output", required=True, help="JSON lines output, appended to and resumed from if it exists")
+    batch.add_argument("--rank", type=parse_objective, default="days=10,idle=1",
+                       help="objective for students without their own (default: days=10,idle=1)")
+    batch.add_argument("--top", type=int, default=1, help="schedules per student (default: 1)")
+    batch.add_argument("--chunk-size", type=int, default=32, help="students sent to a worker at a time")
+    batch.add_argument("--schedules", action="store_true", help="include each timetable, not only the combination")
+    batch.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data)")
+    batch.set_defaults(handler=_command_batch)
+
+    swaps = commands.add_parser("swaps", parents=[common, formats], help="match tutorial switching requests into swaps and cycles")
+    swaps.add_argument("requests", help="one request per row of a .csv or line of a .jsonl file (see swap.read_swap_request)")
+    swaps.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data)")
+    swaps.set_defaults(handler=_command_swaps)
+
+    export_parser = commands.add_parser("export", parents=[common], help="write the timetable of every core group to files")
+    export_parser.add_argument("-o", "--output", required=True, help="directory for the group-<number>.<format> files")
+    export_parser.add_argument("--formats", nargs="+", choices=["json", "csv", "ics"], default=["json", "csv", "ics"])
+    export_parser.add_argument("--term-start", type=lambda value: datetime.date.fromisoformat(value),
+                               help="first day of the term for calendar events, YYYY-MM-DD (default: today)")
+    export_parser.add_argument("--weeks", type=int, default=14, help="weeks the calendar events repeat for (default: 14)")
+    export_parser.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data, - for stdin)")
+    export_parser.set_defaults(handler=_command_export)
+
+    rooms_parser = commands.add_parser("rooms", parents=[common, formats], help="free or booked rooms in a slot, or room usage")
+    rooms_parser.add_argument("what", choices=["free", "busy", "usage"])
+    rooms_parser.add_argument("--day", help="e.g. Tuesday")
+    rooms_parser.add_argument("--slot", help="e.g. 3 or \"Slot 3\"")
+    rooms_parser.add_argument("--building", help="e.g. C7, or H for the lecture halls")
+    rooms_parser.add_argument("--kind", help="only rooms hosting this kind of session, e.g. Lab, Tut or Lecture")
+    rooms_parser.add_argument("--by-building", action="store_true", help="usage per building instead of per room")
+    rooms_parser.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data, - for stdin)")
+    rooms_parser.set_defaults(handler=_command_rooms)
+
+    check = commands.add_parser("check", help="report malformed lines, days and slots in timetable files")
+    check.add_argument("sources", nargs="+", help="timetable text files (- for stdin)")
+    check.set_defaults(handler=_command_check, profile=False, trace=None)
+
+    serve = commands.add_parser("serve", parents=[common], help="answer JSON queries over HTTP from one shared index")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("sources", nargs="*", help="timetable text files (default: the embedded data)")
+    serve.set_defaults(handler=_command_serve)
+    return parser
+
+
+# Parse a command line. argparse matches all of a command's positionals at once, so an empty
+# `sources` list is taken before the options and any source after them is left over
+# (e.g. list core --format json a.txt); whatever is left over that isn't an option is a source.
+def _parse_args(parser, argv):
+    args, extras = parser.parse_known_args(argv)
+    if extras and hasattr(args, "sources") and not any(extra.startswith("-") and extra != "-" for extra in extras):
+        args.sources = args.sources + extras
+    elif extras:
+        parser.error(f"unrecognized arguments: {' '.join(extras)}")
+    return args
+
+
+def main(argv=None):
+    args = _parse_args(build_parser(), argv)
+    if args.command is None:
+        args = _parse_args(build_parser(), ["gui"] + list(argv if argv is not None else sys.argv[1:]))
+    if args.profile or args.trace:
+        profiler.enable(args.trace)
+    try:
+        args.handler(args)
+    except ScheduleParseError as error:
+        raise SystemExit(f"error: {error}")
+
+
 # Run the application
 if __name__ == "__main__":
-    root = tk.Tk()
-    app = ScheduleApp(root)
-    root.mainloop()
\ No newline at end of file
+    main()
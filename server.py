@@ -0,0 +1,130 @@
+import asyncio
+import json
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlsplit
+
+from timetable import ELECTIVE, SEMINAR
+
+
+FILTER_PARAMS = ("core_filter", "elective1", "elective1_tut", "elective2", "elective2_tut", "seminar")
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class QueryError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# Local HTTP/JSON service answering schedule queries from one shared, read-only ScheduleIndex.
+# The index never changes once the server runs, so encoded responses are kept in an LRU cache.
+#
+#   GET /filter?core_filter=009&elective1=NETW%201009&elective1_tut=001&seminar=CSEN%201118
+#   GET /core-tutorials
+#   GET /courses?type=elective|seminar
+#   GET /elective-tutorials?name=NETW%201009
+class ScheduleServer:
+    def __init__(self, index, cache_size=1024):
+        self.index = index
+        self.cache_size = cache_size
+        self._responses = OrderedDict()  # request target -> encoded JSON body
+        self.routes = {
+            "/filter": self._filter,
+            "/core-tutorials": lambda params: self.index.core_tutorials(),
+            "/courses": self._courses,
+            "/elective-tutorials": self._elective_tutorials,
+        }
+
+    def _filter(self, params):
+        unknown = set(params) - set(FILTER_PARAMS)
+        if unknown:
+            raise QueryError(400, f"unknown parameters: {', '.join(sorted(unknown))}")
+        # "None" is what the GUI dropdowns use for no selection
+        return self.index.filter_schedules(**{name: None if value == "None" else value for name, value in params.items()})
+
+    def _courses(self, params):
+        course_type = params.get("type", ELECTIVE)
+        if course_type not in (ELECTIVE, SEMINAR):
+            raise QueryError(400, "type must be elective or seminar")
+        return self.index.course_names(course_type)
+
+    def _elective_tutorials(self, params):
+        if "name" not in params:
+            raise QueryError(400, "missing name")
+        return self.index.elective_tutorials(params["name"])
+
+    # Status and encoded body for a request target such as /filter?core_filter=009
+    def respond(self, target):
+        body = self._responses.get(target)
+        if body is not None:
+            self._responses.move_to_end(target)
+            return 200, body
+        url = urlsplit(target)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, json.dumps({"error": f"no such endpoint {url.path}"}).encode()
+        try:
+            body = json.dumps(route(dict(parse_qsl(url.query)))).encode()
+        except QueryError as error:
+            return error.status, json.dumps({"error": str(error)}).encode()
+        self._responses[target] = body
+        if len(self._responses) > self.cache_size:
+            self._responses.popitem(last=False)
+        return 200, body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break  # The client closed the connection
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 413, b'{"error": "request head too large"}', False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, version = (lines[0].split(" ") + ["", "", ""])[:3]
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length:
+                    await reader.readexactly(length)  # Queries are GET only, a body is ignored
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                if method != "GET":
+                    status, body = 405, b'{"error": "only GET is supported"}'
+                else:
+                    status, body = self.respond(target)
+                await self._send(writer, status, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, status, body, keep_alive):
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        addresses = ", ".join(f"{sock.getsockname()[0]}:{sock.getsockname()[1]}" for sock in server.sockets)
+        print(f"Serving schedule queries on {addresses}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+
+def run(index, host="127.0.0.1", port=8080):
+    try:
+        asyncio.run(ScheduleServer(index).serve(host, port))
+    except KeyboardInterrupt:
+        pass
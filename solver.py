@@ -0,0 +1,513 @@
+import argparse
+import heapq
+from collections import namedtuple
+
+from timetable import CORE, DAYS, ELECTIVE, SEMINAR, SLOTS
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, compatibility then falls back to int bitmasks
+    np = None
+
+
+# A full choice of filters, with the same fields as the filter_schedules parameters
+Combination = namedtuple("Combination", ["core_filter", "elective1", "elective1_tut", "elective2", "elective2_tut", "seminar"])
+
+# A ranked combination and its timetable, in the shape filter_schedules returns
+RankedSchedule = namedtuple("RankedSchedule", ["cost", "combination", "schedule"])
+
+
+# Objectives score the mask of a combination, lower is better. bound() must never exceed the cost
+# of any mask that extends `mask` with bits from `remaining`; it is what lets the ranking prune.
+# The default bound is the cost itself, which is right for objectives that only grow as classes are added.
+class Objective:
+    def cost(self, solver, mask):
+        raise NotImplementedError
+
+    def bound(self, solver, mask, remaining):
+        return self.cost(solver, mask)
+
+
+# Number of days with at least one class
+class CampusDays(Objective):
+    def cost(self, solver, mask):
+        return sum(1 for _, shift, full in solver.rows if mask >> shift & full)
+
+
+# Free slots between the first and last class of each day
+class IdleSlots(Objective):
+    def _idle(self, solver, mask, remaining):
+        idle = 0
+        for _, shift, full in solver.rows:
+            row = mask >> shift & full
+            if row:
+                span = (1 << row.bit_length()) - (row & -row)  # bits from the first to the last class
+                idle += (span & ~row & ~(remaining >> shift)).bit_count()
+        return idle
+
+    def cost(self, solver, mask):
+        return self._idle(solver, mask, 0)
+
+    # A gap can still be filled by a class from `remaining`, so only the gaps it can't fill count
+    def bound(self, solver, mask, remaining):
+        return self._idle(solver, mask, remaining)
+
+
+# How early each day starts: 0 when the first class of a day is in the last slot
+class LateStart(Objective):
+    def cost(self, solver, mask):
+        cost = 0
+        for _, shift, full in solver.rows:
+            row = mask >> shift & full
+            if row:
+                cost += full.bit_length() - (row & -row).bit_length()
+        return cost
+
+
+# Number of classes on a given day, e.g. AvoidDay("Thursday") for a Thursday off
+class AvoidDay(Objective):
+    def __init__(self, day):
+        self.day = day
+
+    def cost(self, solver, mask):
+        for day, shift, full in solver.rows:
+            if day == self.day:
+                return (mask >> shift & full).bit_count()
+        return 0
+
+
+# Weighted sum of objectives, e.g. Weighted({CampusDays(): 10, IdleSlots(): 1})
+class Weighted(Objective):
+    def __init__(self, weights):
+        if any(weight < 0 for weight in weights.values()):
+            raise ValueError("Objective weights must not be negative")
+        self.weights = weights
+
+    def cost(self, solver, mask):
+        return sum(weight * objective.cost(solver, mask) for objective, weight in self.weights.items())
+
+    def bound(self, solver, mask, remaining):
+        return sum(weight * objective.bound(solver, mask, remaining) for objective, weight in self.weights.items())
+
+
+OBJECTIVES = {
+    "days": CampusDays(),
+    "idle": IdleSlots(),
+    "late": LateStart(),
+    "no-thursday": AvoidDay("Thursday"),
+}
+
+
+# Objective of a --rank option such as "days" or "days=10,idle=1"
+def parse_objective(spec):
+    weights = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OBJECTIVES:
+            raise argparse.ArgumentTypeError(f"unknown objective {name!r} (choose from {', '.join(OBJECTIVES)})")
+        weights[OBJECTIVES[name]] = float(weight) if weight else 1
+    return Weighted(weights)
+
+
+# Searches clash-free combinations of a core group, electives and a seminar.
+# Every choice is encoded as a bitmask over the days x slots of the week (30 bits),
+# so two choices clash exactly when their masks share a bit.
+class CombinationSolver:
+    def __init__(self, index):
+        self.index = index
+        self.bits = {}  # (day, slot) -> bit
+        self.rows = []  # (day, shift, mask of a full day) to read one day out of a mask
+        for day in DAYS:
+            self.rows.append((day, len(self.bits), (1 << len(SLOTS)) - 1))
+            for slot in SLOTS:
+                self.bits[(day, slot)] = 1 << len(self.bits)
+
+        # A core group attends its tutorials and labs and the core lectures of its own source, so its mask
+        # holds both; without a core group no core lecture is taken
+        self.core_masks = {number: self._core_mask(number) for number in index.core_tutorials()}
+        self.elective_options = {name: self._elective_options(name) for name in index.course_names(ELECTIVE)}
+        self.seminar_masks = {name: self._mask(index.course_rows(SEMINAR, name)) for name in index.course_names(SEMINAR)}
+
+    def _core_mask(self, number):
+        return self._mask(self.index.core_groups[number]) | self._mask(self.index.core_group_lectures(number))
+
+    # Elective options are (tutorial, mask) pairs, where the mask includes the lectures of the course;
+    # a course without tutorials or labs has a single option for its lectures
+    def _elective_options(self, name):
+        lectures, groups = self.index.course_groups(ELECTIVE, name)
+        lectures = self._mask(lectures)
+        tutorials = self.index.elective_tutorials(name)
+        if tutorials:
+            return [(number, lectures | self._mask(groups[number])) for number in tutorials]
+        return [(None, lectures)]
+
+    # Rebuild the masks of the groups and courses that ScheduleIndex.update_rows reported as changed
+    def update(self, changed):
+        core_tutorials = set(self.index.core_tutorials())
+        for number in changed[CORE]:
+            self.core_masks.pop(number, None)
+            if number in core_tutorials:
+                self.core_masks[number] = self._core_mask(number)
+        for name in changed[ELECTIVE]:
+            self.elective_options.pop(name, None)
+            if name in self.index.courses[ELECTIVE]:
+                self.elective_options[name] = self._elective_options(name)
+        for name in changed[SEMINAR]:
+            self.seminar_masks.pop(name, None)
+            if name in self.index.courses[SEMINAR]:
+                self.seminar_masks[name] = self._mask(self.index.course_rows(SEMINAR, name))
+        # Keep the same order as a fresh solver
+        self.core_masks = dict(sorted(self.core_masks.items()))
+        self.elective_options = dict(sorted(self.elective_options.items()))
+        self.seminar_masks = dict(sorted(self.seminar_masks.items()))
+
+    # Mask of index rows; the bits follow the cell numbers of the schedule
+    def _mask(self, rows):
+        cell_number = self.index.schedule.cell_number
+        mask = 0
+        for row in rows:
+            mask |= 1 << cell_number(row)
+        return mask
+
+    # Mask of a combination, i.e. every slot it occupies
+    def mask(self, combination):
+        mask = self.core_masks.get(combination.core_filter, 0)
+        for name, tutorial in ((combination.elective1, combination.elective1_tut), (combination.elective2, combination.elective2_tut)):
+            if name is not None:
+                mask |= dict(self.elective_options[name]).get(tutorial, 0)
+        if combination.seminar is not None:
+            mask |= self.seminar_masks[combination.seminar]
+        return mask
+
+    # Candidate choices of each kind; None means all of them
+    def _candidates(self, core_groups, electives, n_electives, elective_tutorials, seminars):
+        if not 0 <= n_electives <= 2:
+            raise ValueError("n_electives must be between 0 and 2")
+        cores = [(number, self.core_masks[number]) for number in (self.core_masks if core_groups is None else core_groups)]
+        courses = []
+        for name in self.elective_options if electives is None else electives:
+            allowed = (elective_tutorials or {}).get(name)
+            options = [(tutorial, mask) for tutorial, mask in self.elective_options[name] if allowed is None or tutorial in allowed]
+            if options:
+                courses.append((name, options))
+        seminar_options = [(name, self.seminar_masks[name]) for name in (self.seminar_masks if seminars is None else seminars)]
+        return cores or [(None, 0)], courses, seminar_options or [(None, 0)]
+
+    # Iterate over every clash-free combination. n_electives (0 to 2) electives are picked among the
+    # candidate courses, elective_tutorials optionally restricts the tutorials of some courses,
+    # and an empty seminars list leaves the seminar out. Setting the optional `cancel` event
+    # (e.g., a threading.Event) stops the search early.
+    def search(self, core_groups=None, electives=None, n_electives=2, seminars=None, elective_tutorials=None, cancel=None):
+        cores, courses, seminar_options = self._candidates(core_groups, electives, n_electives, elective_tutorials, seminars)
+
+        def pick_electives(start, used, picked):
+            if len(picked) == n_electives:
+                yield used, picked
+                return
+            for i in range(start, len(courses)):
+                if cancel is not None and cancel.is_set():
+                    return
+                name, options = courses[i]
+                for tutorial, mask in options:
+                    if not mask & used:
+                        yield from pick_electives(i + 1, used | mask, picked + [(name, tutorial)])
+
+        for core, core_mask in cores:
+            for used, picked in pick_electives(0, core_mask, []):
+                picked = picked + [(None, None)] * (2 - len(picked))
+                for seminar, seminar_mask in seminar_options:
+                    if not seminar_mask & used:
+                        yield Combination(core, picked[0][0], picked[0][1], picked[1][0], picked[1][1], seminar)
+
+    # The k best combinations under an objective, found by branch and bound: a partial choice is
+    # dropped as soon as its bound can't beat the k-th best combination found so far.
+    # Takes the same filters as search(); once `cancel` is set, the best results found so far are returned.
+    def best(self, k, objective, core_groups=None, electives=None, n_electives=2, seminars=None, elective_tutorials=None, cancel=None):
+        cores, courses, seminar_options = self._candidates(core_groups, electives, n_electives, elective_tutorials, seminars)
+        seminar_union = 0
+        for _, mask in seminar_options:
+            seminar_union |= mask
+        # course_unions[i] holds every bit the courses from i onwards could still add
+        course_unions = [0] * (len(courses) + 1)
+        for i in range(len(courses) - 1, -1, -1):
+            course_unions[i] = course_unions[i + 1]
+            for _, mask in courses[i][1]:
+                course_unions[i] |= mask
+
+        heap = []  # (-cost, -found, combination), so heap[0] is the current k-th best
+        found = 0
+
+        def worst():
+            return -heap[0][0] if len(heap) == k else float("inf")
+
+        def pick_electives(start, used, picked):
+            nonlocal found
+            if cancel is not None and cancel.is_set():
+                return
+            remaining = seminar_union | (course_unions[start] if len(picked) < n_electives else 0)
+            if objective.bound(self, used, remaining) >= worst():
+                return
+            if len(picked) < n_electives:
+                for i in range(start, len(courses)):
+                    name, options = courses[i]
+                    for tutorial, mask in options:
+                        if not mask & used:
+                            pick_electives(i + 1, used | mask, picked + [(name, tutorial)])
+                return
+            picked = picked + [(None, None)] * (2 - len(picked))
+            for seminar, seminar_mask in seminar_options:
+                if not seminar_mask & used:
+                    cost = objective.cost(self, used | seminar_mask)
+                    if cost < worst():
+                        found += 1
+                        item = (-cost, -found, Combination(core, picked[0][0], picked[0][1], picked[1][0], picked[1][1], seminar))
+                        if len(heap) == k:
+                            heapq.heapreplace(heap, item)
+                        else:
+                            heapq.heappush(heap, item)
+
+        if k > 0:
+            for core, core_mask in cores:
+                pick_electives(0, core_mask, [])
+
+        return [RankedSchedule(-cost, combination, self.index.filter_schedules(*combination))
+                for cost, _, combination in sorted(heap, key=lambda item: (-item[0], -item[1]))]
+
+
+# Pairwise compatibility between every core group, elective option and seminar, used to prune
+# dropdowns down to the choices that don't clash with what is already picked.
+# Rows are keyed (CORE, number, None), (ELECTIVE, name, tutorial) and (SEMINAR, name, None);
+# (ELECTIVE, name, None) stands for the lectures of an elective whose tutorial isn't picked yet.
+# Core rows include the lectures of the group, so choices that clash with them are pruned once it is picked.
+# With numpy the schedule is held as a boolean occupancy array of shape [group x day x slot]
+# and the matrix is computed with vectorized products; without it, rows are compared as bitmasks.
+class CompatibilityMatrix:
+    def __init__(self, solver, chunk_size=2048):
+        self.solver = solver
+        self.chunk_size = chunk_size
+        self._build_rows()
+        self.occupancy = self.matrix = None
+        if np is not None and self.keys:
+            flat = self._occupancy()
+            self.matrix = np.empty((len(self.keys), len(self.keys)), dtype=bool)
+            self._compare(flat, np.arange(len(self.keys)))
+
+    # Keys and masks of every row, in the order of the solver's groups and courses
+    def _build_rows(self):
+        solver = self.solver
+        self.keys = [(CORE, number, None) for number in solver.core_masks]
+        masks = list(solver.core_masks.values())
+        for name, options in solver.elective_options.items():
+            lectures = self._lectures_mask(name)
+            if options[0][0] is not None:
+                self.keys.append((ELECTIVE, name, None))
+                masks.append(lectures)
+            for tutorial, mask in options:
+                self.keys.append((ELECTIVE, name, tutorial))
+                masks.append(mask)
+        for name, mask in solver.seminar_masks.items():
+            self.keys.append((SEMINAR, name, None))
+            masks.append(mask)
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+        self.masks = masks
+
+    # Fill self.occupancy and return the same cells flattened to float32 rows for the products
+    def _occupancy(self):
+        n_days, n_slots = len(self.solver.rows), self.solver.rows[0][2].bit_length()
+        bits = np.arange(n_days * n_slots, dtype=np.int64)
+        flat = (np.array(self.masks, dtype=np.int64)[:, None] >> bits) & 1
+        self.occupancy = flat.astype(bool).reshape(len(self.masks), n_days, n_slots)
+        return flat.astype(np.float32)
+
+    # Compute the matrix rows and columns of `rows`, a chunk at a time.
+    # Two rows are compatible when they share no occupied cell, i.e. their dot product is 0
+    def _compare(self, flat, rows):
+        for start in range(0, len(rows), self.chunk_size):
+            chunk = rows[start:start + self.chunk_size]
+            fits = flat[chunk] @ flat.T == 0
+            self.matrix[chunk] = fits
+            self.matrix[:, chunk] = fits.T
+
+    # Follow CombinationSolver.update after ScheduleIndex.update_rows reported `changed`: only the rows
+    # and columns of the changed core groups, electives and seminars (and of new rows) are compared again,
+    # in O(changed rows x rows); every other pair is kept, moved to its new place if rows came or went
+    def update(self, changed):
+        old_keys, old_rows, old_matrix = self.keys, self.rows, self.matrix
+        self._build_rows()
+        if np is None or not self.keys:
+            self.occupancy = self.matrix = None
+            return
+        flat = self._occupancy()
+        dirty = np.array([row for row, key in enumerate(self.keys) if key[1] in changed[key[0]] or key not in old_rows], dtype=np.intp)
+        if old_matrix is None or self.keys != old_keys:
+            kept = [row for row, key in enumerate(self.keys) if key in old_rows]
+            self.matrix = np.empty((len(self.keys), len(self.keys)), dtype=bool)
+            if kept and old_matrix is not None:
+                old = np.array([old_rows[self.keys[row]] for row in kept], dtype=np.intp)
+                self.matrix[np.ix_(kept, kept)] = old_matrix[np.ix_(old, old)]
+            else:
+                dirty = np.arange(len(self.keys))
+        self._compare(flat, dirty)
+
+    def _lectures_mask(self, name):
+        return self.solver._mask(self.solver.index.course_groups(ELECTIVE, name)[0])
+
+    # Which of the candidate keys don't clash with any of the selected keys (unknown keys are ignored)
+    def compatible(self, selected, candidates):
+        selected = [self.rows[key] for key in selected if key in self.rows]
+        candidates = [self.rows[key] for key in candidates]
+        if self.matrix is not None:
+            if not selected:
+                return [self.keys[row] for row in candidates]
+            ok = self.matrix[np.ix_(selected, candidates)].all(axis=0)
+            return [self.keys[row] for row, fits in zip(candidates, ok) if fits]
+        used = 0
+        for row in selected:
+            used |= self.masks[row]
+        return [self.keys[row] for row in candidates if not self.masks[row] & used]
+
+    # Tutorials of an elective that fit the selection; None for a course without tutorials
+    def compatible_tutorials(self, selected, elective):
+        candidates = [(ELECTIVE, elective, tutorial) for tutorial, _ in self.solver.elective_options.get(elective, [])]
+        return [tutorial for _, _, tutorial in self.compatible(selected, candidates)]
+
+    # Electives with at least one option that fits the selection, or seminars that fit it
+    def compatible_courses(self, selected, course_type):
+        if course_type == SEMINAR:
+            return [name for _, name, _ in self.compatible(selected, [(SEMINAR, name, None) for name in self.solver.seminar_masks])]
+        candidates = [(ELECTIVE, name, tutorial) for name, options in self.solver.elective_options.items() for tutorial, _ in options]
+        return list(dict.fromkeys(name for _, name, _ in self.compatible(selected, candidates)))
+
+
+# What-if exploration over the four choices of a schedule: a core group, two elective options and a
+# seminar, each assumed to be taken. Pinning a choice narrows its domain, then the domains are made
+# arc consistent (AC-3): a value only stays while every other choice still has a value that doesn't
+# clash with it. That makes the domains pairwise consistent, which is not the same as completable:
+# each value left fits some value of every other choice, but those values may clash with each other
+# (e.g., two electives that each fit a seminar slot, but not together). Domains are sets of
+# CompatibilityMatrix rows and every removal is logged on a trail, so undoing a pin puts back
+# exactly what it removed, in O(removals), without propagating.
+class ChoicePropagator:
+    VARIABLES = ("core", "elective1", "elective2", "seminar")
+
+    def __init__(self, compatibility):
+        self.compatibility = compatibility
+        solver, rows = compatibility.solver, compatibility.rows
+        electives = {rows[(ELECTIVE, name, tutorial)] for name, options in solver.elective_options.items() for tutorial, _ in options}
+        self.domains = {
+            "core": {rows[(CORE, number, None)] for number in solver.core_masks},
+            "elective1": set(electives),
+            "elective2": set(electives),
+            "seminar": {rows[(SEMINAR, name, None)] for name in solver.seminar_masks},
+        }
+        # Course of every row, as small integers for numpy, since both electives can't be the same course
+        names = {}
+        self.names = [names.setdefault(key[1], len(names)) for key in compatibility.keys]
+        self.member = self.supports = None
+        if np is not None and compatibility.matrix is not None:
+            self.names = np.array(self.names)
+            # Domains again as boolean arrays, and the last support found for each (variable, other, row).
+            # A support that is still in the other domain proves the row is supported without a search,
+            # so after the first pass only rows that lost their support are compared against the matrix.
+            self.member = {}
+            for variable, domain in self.domains.items():
+                self.member[variable] = np.zeros(len(compatibility.keys), dtype=bool)
+                self.member[variable][list(domain)] = True
+            self.supports = {(x, y): np.full(len(compatibility.keys), -1, dtype=np.intp)
+                             for x in self.VARIABLES for y in self.VARIABLES if x != y}
+        self.trail = []  # (variable, row) in the order rows were removed
+        self.pins = []  # (label, variable, length of the trail before the pin)
+        self.consistent = True
+        # Values that can't be part of any clash-free schedule go for good, before anything is pinned
+        self._propagate([(x, y) for x in self.VARIABLES for y in self.VARIABLES if x != y])
+        self.trail.clear()
+
+    # Rows of `variable` without a compatible row in `other`
+    def _unsupported(self, variable, other):
+        domain, others = self.domains[variable], self.domains[other]
+        if not domain:
+            return []
+        both_electives = variable.startswith(ELECTIVE) and other.startswith(ELECTIVE)
+        matrix = self.compatibility.matrix
+        if self.member is not None:
+            rows = np.fromiter(domain, dtype=np.intp, count=len(domain))
+            supports = self.supports[(variable, other)]
+            last = supports[rows]
+            rows = rows[(last < 0) | ~self.member[other][last]]
+            if not len(rows):
+                return []
+            other_rows = np.fromiter(others, dtype=np.intp, count=len(others))
+            fits = matrix[np.ix_(rows, other_rows)]
+            if both_electives:
+                fits &= self.names[rows][:, None] != self.names[other_rows][None, :]
+            supported = fits.any(axis=1)
+            if len(other_rows):
+                supports[rows[supported]] = other_rows[fits[supported].argmax(axis=1)]
+            return rows[~supported].tolist()
+        # Rows sharing a mask are interchangeable, so each distinct mask is only tried once
+        masks = self.compatibility.masks
+        other_masks = {}
+        for row in others:
+            other_masks.setdefault(masks[row], set()).add(self.names[row])
+        unsupported = []
+        for row in domain:
+            mask, name = masks[row], self.names[row]
+            if not any(not mask & other_mask and (not both_electives or len(other_names) > 1 or name not in other_names)
+                       for other_mask, other_names in other_masks.items()):
+                unsupported.append(row)
+        return unsupported
+
+    def _remove(self, variable, rows):
+        domain = self.domains[variable]
+        for row in rows:
+            domain.discard(row)
+            self.trail.append((variable, row))
+        if self.member is not None:
+            self.member[variable][rows] = False
+
+    # AC-3 over a queue of arcs (variable, other); a variable that loses values puts the arcs
+    # into it from every other variable back on the queue. Stops as soon as a domain runs empty.
+    def _propagate(self, arcs):
+        queue = list(arcs)
+        queued = set(queue)
+        while queue:
+            arc = queue.pop(0)
+            queued.discard(arc)
+            variable, other = arc
+            removed = self._unsupported(variable, other)
+            if not removed:
+                continue
+            self._remove(variable, removed)
+            if not self.domains[variable]:
+                self.consistent = False
+                return
+            for neighbour in self.VARIABLES:
+                if neighbour not in (variable, other) and (neighbour, variable) not in queued:
+                    queue.append((neighbour, variable))
+                    queued.add((neighbour, variable))
+
+    # Narrow `variable` to `rows` and propagate; `label` names the pin for the caller.
+    # Returns whether every choice still has a value left.
+    def pin(self, label, variable, rows):
+        self.pins.append((label, variable, len(self.trail)))
+        self._remove(variable, [row for row in self.domains[variable] if row not in rows])
+        if not self.domains[variable]:
+            self.consistent = False
+        else:
+            self._propagate([(other, variable) for other in self.VARIABLES if other != variable])
+        return self.consistent
+
+    # Take back the last pin
+    def undo(self):
+        label, variable, length = self.pins.pop()
+        while len(self.trail) > length:
+            variable, row = self.trail.pop()
+            self.domains[variable].add(row)
+            if self.member is not None:
+                self.member[variable][row] = True
+        self.consistent = all(self.domains.values())
+        return label
+
+    # Keys of the values left for a variable, in the order of the matrix rows
+    def values(self, variable):
+        return [self.compatibility.keys[row] for row in sorted(self.domains[variable])]
@@ -0,0 +1,179 @@
+from collections import defaultdict, namedtuple
+
+from batch import iter_preferences, read_list, read_number
+from solver import Combination
+
+
+# A student holding the groups in `combination` who wants to move to one of `targets` in `course`,
+# which is "core" for the core group or the name of one of their electives
+SwapRequest = namedtuple("SwapRequest", ["student", "combination", "course", "current", "targets"])
+Move = namedtuple("Move", ["student", "course", "current", "target"])
+
+
+# One request per row of a .csv or .jsonl file with the columns of Combination (the groups the
+# student holds now), a `change` column naming the course and a `want` column listing the groups
+# they would move to, e.g. change=NETW 1009, want="003; 004"
+def read_swap_request(student, row):
+    values = {field: row.get(field) or None for field in Combination._fields}
+    for field in ("core_filter", "elective1_tut", "elective2_tut"):
+        if values[field] is not None:
+            values[field] = read_number(values[field])
+    combination = Combination(**values)
+    course = row.get("change") or "core"
+    if course == "core":
+        current = combination.core_filter
+    elif course == combination.elective1:
+        current = combination.elective1_tut
+    elif course == combination.elective2:
+        current = combination.elective2_tut
+    else:
+        raise ValueError(f"{student} doesn't take {course}")
+    if current is None:
+        raise ValueError(f"{student} has no group in {course} to switch from")
+    targets = [read_number(target) for target in read_list(row.get("want")) or []]
+    return SwapRequest(student, combination, course, current, [target for target in targets if target != current])
+
+
+# Matches switching requests so that every student ends up clash-free and no group gains or loses
+# a seat: a student only moves into a group that someone else leaves in the same course.
+#
+# Requests are the edges of a graph per course whose nodes are groups: a request goes from the
+# student's group to each target that fits the rest of their timetable (checked on the solver's
+# slot masks). Each cycle of that graph is a set of moves that can happen at once, and each student
+# moves at most once. Direct swaps (2-cycles) are taken first, as they need only two students
+# to agree, then longer cycles are cancelled in one depth-first pass that never revisits an edge.
+class SwapMatcher:
+    def __init__(self, solver):
+        self.solver = solver
+        self.requests = []
+        self.edges = defaultdict(list)  # (course, group) -> [(request, target)]
+        self.pairs = defaultdict(list)  # (course, group, target) -> [request]
+        self.infeasible = 0  # targets dropped because they would clash
+
+    # Slot masks of the electives and the seminar of a combination
+    def _masks(self, combination):
+        masks = []
+        for name, tutorial in ((combination.elective1, combination.elective1_tut), (combination.elective2, combination.elective2_tut)):
+            if name is not None:
+                masks.append(dict(self.solver.elective_options[name])[tutorial])
+        if combination.seminar is not None:
+            masks.append(self.solver.seminar_masks[combination.seminar])
+        return masks
+
+    # The core group and its lectures are always in the timetable, as in CombinationSolver.search,
+    # so the electives and the seminar have to fit around them and each other
+    def _clash_free(self, combination):
+        used = 0
+        if combination.core_filter is not None:
+            used = self.solver.core_masks[combination.core_filter]
+        for mask in self._masks(combination):
+            if mask & used:
+                return False
+            used |= mask
+        return True
+
+    def _moved(self, request, target):
+        combination = request.combination
+        if request.course == "core":
+            return combination._replace(core_filter=target)
+        if request.course == combination.elective1:
+            return combination._replace(elective1_tut=target)
+        return combination._replace(elective2_tut=target)
+
+    # Add a request with an edge for each target the student could move to without a clash
+    def add(self, request):
+        n = len(self.requests)
+        self.requests.append(request)
+        for target in request.targets:
+            try:
+                feasible = self._clash_free(self._moved(request, target))
+            except KeyError:
+                feasible = False  # No such group
+            if not feasible:
+                self.infeasible += 1
+                continue
+            self.edges[(request.course, request.current)].append((n, target))
+            self.pairs[(request.course, request.current, target)].append(n)
+
+    def _cycle(self, edges):
+        return [Move(self.requests[n].student, self.requests[n].course, self.requests[n].current, target) for n, target in edges]
+
+    # Direct swaps between two students who each want the other's group
+    def _swaps(self, moved):
+        swaps = []
+        for (course, group, target), requests in self.pairs.items():
+            partners = self.pairs.get((course, target, group))
+            if not partners or group > target:
+                continue  # Each pair of groups is looked at once
+            while requests and partners:
+                n, m = requests[-1], partners[-1]
+                if self.requests[n].student in moved:
+                    requests.pop()
+                elif self.requests[m].student in moved or self.requests[m].student == self.requests[n].student:
+                    partners.pop()
+                else:
+                    moved.update((self.requests[n].student, self.requests[m].student))
+                    swaps.append(self._cycle([(n, target), (m, group)]))
+        return swaps
+
+    # Cycles of three or more moves: walk unused edges depth first from every group, cutting
+    # a cycle off the path as soon as it closes. A group whose edges are all used up can never
+    # be on a cycle again, so it is marked dead and the edge into it is dropped.
+    def _cycles(self, moved):
+        cycles = []
+        dead = set()
+        for start in list(self.edges):
+            if start in dead:
+                continue
+            groups = [start]
+            path = []  # (request, target) taken out of each group on the path but the last
+            position = {start: 0}
+            while groups:
+                course, group = groups[-1]
+                edges = self.edges[(course, group)]
+                edge = None
+                while edges:
+                    n, target = edges.pop()
+                    if self.requests[n].student not in moved and (course, target) not in dead:
+                        edge = (n, target)
+                        break
+                if edge is None:
+                    dead.add(groups.pop())
+                    del position[(course, group)]
+                    if path:
+                        path.pop()
+                    continue
+                node = (course, edge[1])
+                if node in position:
+                    at = position[node]
+                    cycle = path[at:] + [edge]
+                    moved.update(self.requests[n].student for n, _ in cycle)
+                    cycles.append(self._cycle(cycle))
+                    for closed in groups[at + 1:]:
+                        del position[closed]
+                    del groups[at + 1:]
+                    del path[at:]
+                else:
+                    position[node] = len(groups)
+                    groups.append(node)
+                    path.append(edge)
+        return cycles
+
+    # Lists of moves, each list to be carried out together; direct swaps come first.
+    # Matching uses up the edges, so it is done once per matcher.
+    def match(self):
+        moved = set()
+        return self._swaps(moved) + self._cycles(moved)
+
+
+# Read switching requests from a .csv or .jsonl file and match them; returns the matcher,
+# the groups of moves and the rows that couldn't be read as (student, error)
+def match_requests(solver, path):
+    matcher = SwapMatcher(solver)
+    errors = []
+    for student, row in iter_preferences(path):
+        try:
+            matcher.add(read_swap_request(student, row))
+        except (KeyError, ValueError) as error:
+            errors.append((student, str(error)))
+    return matcher, matcher.match(), errors
@@ -0,0 +1,93 @@
+import argparse
+import random
+import sys
+
+from timetable import DAYS, SLOTS
+
+
+MAJORS = ["MET", "IET", "EMS", "MCTR", "BI", "ARCH", "PHARM", "DENT", "LAW", "MNGT"]
+SUBJECTS = ["CSEN", "DMET", "NETW", "ELCT", "COMM", "MCTR", "HUMA", "MATH", "PHYS", "BINF"]
+BUILDINGS = ["A", "B", "C", "D"]
+
+
+# Realistic timetable text in the exact format parse_data expects, as exported by the
+# timetable office: a day header, then each slot's entries ("Free" when empty), each slot
+# closed by a line of asterisks, and a trailing Friday with only free slots.
+#
+# Every major gets `core_courses` core courses with a tutorial (and a lab for every other course)
+# per group and a lecture for each `lecture_size` groups, `electives` electives with
+# `elective_groups` tutorial groups each, and `seminars` seminars meeting twice a week.
+# Core group numbers run on across majors, as in the per-major exports.
+# max_entries_per_slot caps how crowded a (day, slot) cell can get.
+def generate_timetable(majors=1, core_groups=12, core_courses=4, electives=10, elective_groups=8, seminars=10,
+                       lecture_size=12, max_entries_per_slot=None, seed=0):
+    rng = random.Random(seed)
+    cells = {(day, slot): [] for day in DAYS for slot in SLOTS}
+    codes = iter(range(1000, 10000))
+
+    def room():
+        if rng.random() < 0.1:
+            return f"H{rng.randint(1, 20)}"
+        return f"{rng.choice(BUILDINGS)}{rng.randint(1, 7)}.{rng.randint(1, 3)}{rng.randint(0, 20):02d}"
+
+    def place(line):
+        free = [cell for cell, lines in cells.items() if max_entries_per_slot is None or len(lines) < max_entries_per_slot]
+        if not free:
+            raise ValueError("max_entries_per_slot is too small for this many classes")
+        cells[rng.choice(free)].append(line)
+
+    for m in range(majors):
+        major = f"{10 - m // len(MAJORS)}{MAJORS[m % len(MAJORS)]}"
+        for c in range(core_courses):
+            course = f"{rng.choice(SUBJECTS)} {next(codes)}"
+            for lecture in range(0, core_groups, lecture_size):
+                place(f"{major} L{lecture // lecture_size + 1:03d}\t{room()}\t{course} Lecture")
+            for group in range(m * core_groups + 1, (m + 1) * core_groups + 1):  # group numbers are unique across majors
+                place(f"{major} T{group:03d}\t{room()}\t{course} Tut")
+                if c % 2 == 0:
+                    place(f"{major} P{group:03d}\t{room()}\t{course} Lab")
+        for _ in range(electives):
+            course = f"{rng.choice(SUBJECTS)} {next(codes)}"
+            for lecture in range(rng.randint(1, 2)):
+                place(f"{major}-EL L{lecture + 1:03d}\t{room()}\t{course} Lecture")
+            for group in range(1, elective_groups + 1):
+                place(f"{major}-EL T{group:03d}\t{room()}\t{course} Tut")
+        for _ in range(seminars):
+            course = f"{rng.choice(SUBJECTS)} {next(codes)}"
+            for session in range(2):
+                place(f"{major}-Seminar L{session + 1:03d}\t{room()}\t{course} Lecture")
+
+    lines = []
+    for day in DAYS + ["Friday"]:
+        lines.append(f"{day}\t")
+        for slot in SLOTS:
+            lines.extend(cells.get((day, slot)) or ["Free"])
+            lines.append("**********")
+        lines.append("")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic timetable in the format parse_data expects.")
+    parser.add_argument("--majors", type=int, default=1)
+    parser.add_argument("--core-groups", type=int, default=12)
+    parser.add_argument("--core-courses", type=int, default=4)
+    parser.add_argument("--electives", type=int, default=10)
+    parser.add_argument("--elective-groups", type=int, default=8)
+    parser.add_argument("--seminars", type=int, default=10)
+    parser.add_argument("--max-entries-per-slot", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+    text = generate_timetable(args.majors, args.core_groups, args.core_courses, args.electives, args.elective_groups,
+                              args.seminars, max_entries_per_slot=args.max_entries_per_slot, seed=args.seed)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import json
+
+import batch
+import schedule
+from schedule import ScheduleIndex
+from solver import CombinationSolver, parse_objective
+
+
+def write_preferences(path, rows):
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+
+
+def test_run_resumes_after_an_interrupted_line(tmp_path):
+    index = ScheduleIndex(schedule.ingest(schedule.data, workers=1))
+    preferences = tmp_path / "preferences.jsonl"
+    write_preferences(preferences, [{"student": f"s{n}", "core": number, "n_electives": 1, "seminars": "none"}
+                                    for n, number in enumerate(index.core_tutorials()[:5])] +
+                      [{"student": "bad", "core": "999"}])
+    output = tmp_path / "results.jsonl"
+    assert batch.run(index, preferences, output, workers=1, chunk_size=2) == (0, 6)
+    lines = output.read_text(encoding="utf-8").splitlines(keepends=True)
+    results = [json.loads(line) for line in lines]
+    assert [result["student"] for result in results] == ["s0", "s1", "s2", "s3", "s4", "bad"]
+    assert results[-1]["error"].startswith("KeyError")
+    best = CombinationSolver(index).best(1, parse_objective("days=10,idle=1"), core_groups=[index.core_tutorials()[0]], n_electives=1, seminars=[])
+    assert results[0]["results"] == [{"cost": best[0].cost, "combination": best[0].combination._asdict()}]
+
+    # An interruption cuts the third line off: it is truncated away and solved again
+    output.write_text("".join(lines[:2]) + lines[2][:10], encoding="utf-8")
+    assert batch.read_checkpoint(output) == {"s0", "s1"}
+    assert output.read_text(encoding="utf-8") == "".join(lines[:2])
+    assert batch.run(index, preferences, output, workers=1, chunk_size=2) == (2, 4)
+    assert output.read_text(encoding="utf-8").splitlines(keepends=True) == lines
+    assert batch.run(index, preferences, output, workers=1) == (6, 0)
+
+
+def test_process_pool_writes_the_same_results(tmp_path):
+    index = ScheduleIndex(schedule.ingest(schedule.data, workers=1))
+    preferences = tmp_path / "preferences.jsonl"
+    write_preferences(preferences, [{"student": f"s{n}", "core": number, "n_electives": 1, "seminars": "none"}
+                                    for n, number in enumerate(index.core_tutorials()[:6])])
+    assert batch.run(index, preferences, tmp_path / "serial.jsonl", workers=1) == (0, 6)
+    assert batch.run(index, preferences, tmp_path / "pool.jsonl", workers=2, chunk_size=1) == (0, 6)
+    serial = (tmp_path / "serial.jsonl").read_text(encoding="utf-8").splitlines()
+    assert sorted((tmp_path / "pool.jsonl").read_text(encoding="utf-8").splitlines()) == sorted(serial)
@@ -0,0 +1,48 @@
+import csv
+import datetime
+import io
+import json
+
+import schedule
+from export import SLOT_TIMES, GroupTimetables
+from schedule import DAYS, filter_schedules
+
+
+def test_group_files_match_filter_schedules(tmp_path):
+    combined = schedule.ingest(schedule.data, workers=1)
+    timetables = GroupTimetables(combined)
+    assert timetables.numbers == schedule.extract_core_tutorials(combined)
+    term_start = datetime.date(2026, 9, 16)  # A Wednesday
+    paths = timetables.export(tmp_path, term_start=term_start, weeks=2)
+    assert len(paths) == 3 * len(timetables.numbers)
+    for number in timetables.numbers[::5]:
+        expected = filter_schedules(combined, number)
+        assert timetables.timetable(number) == expected
+        with open(tmp_path / f"group-{number}.json", encoding="utf-8") as f:
+            assert json.load(f) == expected
+        with open(tmp_path / f"group-{number}.csv", newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        cells = [(day, slot, text) for day, slots in expected.items() for slot, cell in slots.items() for text in cell]
+        assert rows == [["day", "slot", "entry"]] + [list(cell) for cell in cells]
+
+        # One weekly event per entry, on the day of its column in the week of term_start, which starts on Saturday
+        with open(tmp_path / f"group-{number}.ics", newline="", encoding="utf-8") as f:
+            lines = f.read().replace("\r\n ", "").split("\r\n")
+        starts = [line.removeprefix("DTSTART:") for line in lines if line.startswith("DTSTART:")]
+        assert len(starts) == len(cells) and lines.count("RRULE:FREQ=WEEKLY;COUNT=2") == len(cells)
+        for (day, slot, _), start in zip(cells, starts):
+            date = datetime.date(2026, 9, 12) + datetime.timedelta(days=DAYS.index(day))
+            assert start == f"{date:%Y%m%d}T{SLOT_TIMES[slot][0]}00"
+            assert date.strftime("%A") == day
+
+
+def test_ics_weeks_start_on_the_saturday_before_the_term():
+    timetables = GroupTimetables(schedule.ingest(schedule.data, workers=1))
+    number = timetables.numbers[0]
+    days = [day for day, _, _ in timetables.entries(number)]
+    for term_start, saturday in ((datetime.date(2026, 9, 12), datetime.date(2026, 9, 12)), (datetime.date(2026, 9, 18), datetime.date(2026, 9, 12)),
+                                 (datetime.date(2026, 9, 19), datetime.date(2026, 9, 19))):
+        out = io.StringIO(newline="")
+        timetables.write_ics(number, out, term_start, 1)
+        starts = [line.removeprefix("DTSTART:")[:8] for line in out.getvalue().split("\r\n") if line.startswith("DTSTART:")]
+        assert starts == [f"{saturday + datetime.timedelta(days=DAYS.index(day)):%Y%m%d}" for day in days]
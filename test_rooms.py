@@ -0,0 +1,41 @@
+import pytest
+
+import schedule
+from rooms import RoomIndex, building
+from schedule import parse_data
+from synthetic import generate_timetable
+
+
+@pytest.fixture(params=["embedded", "synthetic"])
+def combined(request):
+    if request.param == "embedded":
+        return schedule.ingest(schedule.data, workers=1)
+    return parse_data(generate_timetable(majors=3, seed=5))
+
+
+def test_free_and_busy_match_a_scan(combined):
+    rooms = RoomIndex(combined)
+    entries = [(day, slot, entry) for day, slots in combined.items() for slot, cell in slots.items() for entry in cell]
+    known = {entry.location for _, _, entry in entries}
+    for building_name, kind in ((None, None), ("C7", None), (None, "Lab"), ("H", "Lecture"), ("Z9", None)):
+        selected = {room for room in known if building_name is None or building(room) == building_name}
+        if kind is not None:
+            selected &= {entry.location for _, _, entry in entries if entry.session_type == kind}
+        for day in schedule.DAYS:
+            for slot in schedule.SLOTS:
+                busy = {entry.location for entry in combined[day][slot]}
+                assert rooms.busy(day, slot, building_name, kind) == sorted(selected & busy)
+                assert rooms.free(day, slot, building_name, kind) == sorted(selected - busy)
+
+
+def test_utilization_counts_booked_cells(combined):
+    rooms = RoomIndex(combined)
+    booked = {(day, slot, entry.location) for day, slots in combined.items() for slot, cell in slots.items() for entry in cell}
+    usage = {item.name: item for item in rooms.utilization()}
+    for room, item in usage.items():
+        assert (item.rooms, item.cells) == (1, 30)
+        assert item.occupied == sum(location == room for _, _, location in booked)
+    for item in rooms.utilization(by_building=True):
+        members = [room for room in usage if building(room) == item.name]
+        assert item.rooms == len(members) and item.occupied == sum(usage[room].occupied for room in members)
+        assert item.utilization == pytest.approx(item.occupied / (30 * len(members)))
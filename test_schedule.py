@@ -0,0 +1,292 @@
+import io
+import itertools
+import json
+import os
+import pickle
+import threading
+import time
+
+import pytest
+
+import schedule
+from schedule import (DAYS, ELECTIVE, SEMINAR, SLOTS, BackgroundWorker, FilterCache, Profiler, ScheduleCache, ScheduleIndex,
+                      ScheduleParseError, SourceWatcher, filter_schedules, parse_data)
+from synthetic import generate_timetable
+
+
+def timetable(days):
+    lines = []
+    for day in DAYS:
+        lines.append(day)
+        for slot in range(len(SLOTS)):
+            lines.extend(days.get(day, {}).get(slot, ["Free"]))
+            lines.append("**********")
+    return "\n".join(lines) + "\n"
+
+
+def errors(text):
+    diagnostics = []
+    parse_data(text, diagnostics)
+    return [(diagnostic.line, diagnostic.message) for diagnostic in diagnostics if diagnostic.severity == "error"]
+
+
+def fields(parsed):
+    return {day: {slot: [(str(entry), entry.category, entry.group_kind, entry.group_number, entry.base_name,
+                          entry.session_type, entry.is_lecture) for entry in entries] for slot, entries in slots.items()}
+            for day, slots in parsed.items()}
+
+
+def test_parse_embedded_data():
+    for source in schedule.data:
+        assert errors(source) == []
+    parsed = parse_data(schedule.data[0])
+    entry = parsed["Sunday"]["Slot 1"][0]
+    assert (entry.course_code, entry.group, entry.location, entry.course_name) == ("10MET", "P008", "C7.217", "CSEN 1002 Lab")
+    assert (entry.category, entry.group_kind, entry.group_number, entry.base_name, entry.session_type) == ("core", "P", "008", "CSEN 1002", "Lab")
+    assert parsed["Monday"]["Slot 5"][0].category == SEMINAR and parsed["Monday"]["Slot 5"][0].is_lecture
+
+
+def test_index_filter_matches_filter_schedules():
+    combined = schedule.ingest(schedule.data, workers=1)
+    index = ScheduleIndex(combined)
+    electives = index.course_names(ELECTIVE)
+    seminars = [None] + index.course_names(SEMINAR)[:4]
+    assert index.core_tutorials() == schedule.extract_core_tutorials(combined)
+    for name in electives:
+        assert index.elective_tutorials(name) == schedule.extract_elective_tutorials(combined, name)
+    for core in [None, "T009"] + index.core_tutorials():
+        for elective1, elective2 in itertools.combinations([None] + electives[:5], 2):
+            for tutorial in ("All", "001", "003"):
+                for seminar in seminars:
+                    filters = (core, elective1, tutorial, elective2, "All", seminar)
+                    assert index.filter_schedules(*filters) == filter_schedules(combined, *filters)
+
+
+def test_sources_parse_the_same_however_they_are_read(tmp_path):
+    text = generate_timetable(majors=2, seed=1)
+    path = tmp_path / "a.txt"
+    path.write_text(text, encoding="utf-8")
+    expected = fields(parse_data(text))
+    assert fields(parse_data(path)) == expected
+    assert fields(parse_data(iter(text.splitlines()))) == expected
+    with open(path, "rb") as f:
+        assert fields(parse_data(f)) == expected
+
+
+def test_cache_round_trip(tmp_path):
+    path = tmp_path / "a.txt"
+    path.write_text(schedule.data[0].replace("C7.217", "Ç7.217"), encoding="utf-8")
+    expected = fields(parse_data(path))
+    cache = ScheduleCache(str(tmp_path / "cache"))
+    first = cache.parse([path, schedule.data[1]])
+    index = cache.index(schedule.combine_schedules(*first))
+    again = ScheduleCache(str(tmp_path / "cache"))
+    second = again.parse([path, schedule.data[1]])
+    assert fields(second[0]) == fields(first[0]) == expected
+    assert fields(second[1]) == fields(parse_data(schedule.data[1]))
+    assert again.index(schedule.combine_schedules(*second)).derived_lists() == index.derived_lists()
+
+
+def test_filter_cache_evicts_the_least_recently_used():
+    index = ScheduleIndex(schedule.ingest(schedule.data, workers=1))
+    cache = FilterCache(index, maxsize=2)
+    first = cache.filter_schedules("009")
+    cache.filter_schedules("010")
+    assert cache.filter_schedules("009") is first
+    cache.filter_schedules("011")  # Evicts 010, the least recently used
+    assert cache.cache_info() == (1, 3, 2, 2, 0)
+    cache.filter_schedules("010")
+    assert cache.cache_info().misses == 4
+    assert {day: {slot: list(cell) for slot, cell in slots.items()} for day, slots in first.items()} == index.filter_schedules("009")
+    with pytest.raises(TypeError):
+        first["Sunday"]["Slot 1"] = []
+    assert isinstance(first["Sunday"]["Slot 1"], tuple)
+    cache.reload(index)
+    assert cache.cache_info() == (1, 4, 2, 0, 1)
+    assert cache.filter_schedules("009") is not first and cache.cache_info().misses == 5
+
+
+def test_sources_after_options():
+    args = schedule._parse_args(schedule.build_parser(), ["list", "core", "--format", "json", "a.txt", "b.txt"])
+    assert (args.what, args.format, args.sources) == ("core", "json", ["a.txt", "b.txt"])
+    args = schedule._parse_args(schedule.build_parser(), ["rooms", "free", "--day", "Tuesday", "--slot", "3", "a.txt"])
+    assert (args.day, args.slot, args.sources) == ("Tuesday", "3", ["a.txt"])
+    with pytest.raises(SystemExit):
+        schedule._parse_args(schedule.build_parser(), ["list", "core", "a.txt", "--bogus"])
+
+
+def test_profiler_report_and_trace(tmp_path, monkeypatch):
+    monkeypatch.setattr(schedule.atexit, "register", lambda function: function)
+    profiler = Profiler()
+
+    @profiler.timed("work")
+    def work(n):
+        return 2 * n
+
+    assert work(1) == 2 and not profiler.times  # Nothing is recorded until the profiler is enabled
+    trace = tmp_path / "trace.json"
+    profiler.enable(str(trace))
+    assert [work(n) for n in range(3)] == [0, 2, 4]
+    profiler.count("entries scanned", 5)
+    out = io.StringIO()
+    profiler.report(out)
+    lines = out.getvalue().splitlines()
+    assert lines[0].split() == ["phase", "calls", "total", "ms", "mean", "ms"]
+    assert lines[1].split()[:2] == ["work", "3"]
+    assert lines[2].split() == ["entries", "scanned", "5"]
+    assert lines[3] == f"Chrome trace written to {trace}"
+    events = json.loads(trace.read_text(encoding="utf-8"))["traceEvents"]
+    assert [event["name"] for event in events] == ["work"] * 3
+    assert all(event["ph"] == "X" and event["dur"] >= 0 for event in events)
+
+
+def test_watch_is_a_flag():
+    args = schedule._parse_args(schedule.build_parser(), ["gui", "--watch", "a.txt", "b.txt"])
+    assert (args.watch, args.watch_interval, args.sources) == (True, 2.0, ["a.txt", "b.txt"])
+    args = schedule._parse_args(schedule.build_parser(), ["gui", "--watch", "--watch-interval", "0.5", "a.txt"])
+    assert (args.watch, args.watch_interval, args.sources) == (True, 0.5, ["a.txt"])
+
+
+def test_update_rows_matches_a_fresh_index():
+    combined = parse_data(generate_timetable(majors=1, seed=4))
+    index = ScheduleIndex(combined)
+    sunday = [combined.fields(row) for row in combined.rows("Sunday", "Slot 1")]
+    moved = [fields for fields, entry in zip(sunday, combined["Sunday"]["Slot 1"]) if entry.category == ELECTIVE][:2]
+    monday = [combined.fields(row) for row in combined.rows("Monday", "Slot 3")]
+    removed, added = combined.set_cells({("Sunday", "Slot 1"): [fields for fields in sunday if fields not in moved],
+                                         ("Monday", "Slot 3"): monday + moved, ("Tuesday", "Slot 2"): []})
+    changed = index.update_rows(removed, added)
+    fresh = ScheduleIndex(combined)
+    assert {course_name.rpartition(" ")[0] for _, _, _, course_name in moved} <= changed[ELECTIVE]
+    assert [str(entry) for entry in combined["Monday"]["Slot 3"]][-2:] == [" ".join(fields) for fields in moved]
+    assert index.derived_lists() == fresh.derived_lists()
+    for core in [None] + fresh.core_tutorials():
+        for elective in [None] + fresh.course_names(ELECTIVE):
+            assert index.filter_schedules(core, elective) == fresh.filter_schedules(core, elective)
+
+
+def test_source_watcher_patches_the_changed_file(tmp_path):
+    paths = [tmp_path / "a.txt", tmp_path / "b.txt"]
+    for path, seed in zip(paths, (1, 2)):
+        path.write_text(generate_timetable(seed=seed), encoding="utf-8")
+    combined = schedule.combine_schedules(*map(parse_data, paths))
+    index = ScheduleIndex(combined)
+    watcher = SourceWatcher(paths, combined, index)
+    assert watcher.poll() == (set(), None)
+
+    def write(path, text):
+        path.write_text(text, encoding="utf-8")
+        stamp = time.time_ns() + 10 ** 9  # A new mtime even where its resolution is coarse
+        os.utime(path, ns=(stamp, stamp))
+
+    write(paths[1], generate_timetable(seed=3))
+    cells, changed = watcher.poll()
+    fresh = schedule.combine_schedules(parse_data(paths[0]), parse_data(paths[1]))
+    assert cells and changed is not None
+    assert {day: {slot: [str(entry) for entry in cell] for slot, cell in slots.items()} for day, slots in combined.items()} == \
+           {day: {slot: [str(entry) for entry in cell] for slot, cell in slots.items()} for day, slots in fresh.items()}
+    assert index.derived_lists() == ScheduleIndex(fresh).derived_lists()
+
+    # A malformed file is reported once and kept out until it changes again
+    write(paths[0], "Sunday\n10MET T009\n")
+    assert watcher.poll() == (set(), None)
+    assert isinstance(watcher.errors[paths[0]], ScheduleParseError)
+    assert watcher.poll() == (set(), None)
+    write(paths[0], generate_timetable(seed=1))
+    assert watcher.poll() == (set(), None) and not watcher.errors  # Back to what the schedule already holds
+
+
+def test_combined_schedule_keeps_the_order_of_the_sources():
+    parts = [parse_data(source) for source in schedule.data]
+    combined = schedule.combine_schedules(*parts)
+    assert combined.entry_count() == sum(part.entry_count() for part in parts)
+    restored = pickle.loads(pickle.dumps(combined))
+    for day in DAYS:
+        for slot in SLOTS:
+            expected = [str(entry) for part in parts for entry in part[day][slot]]
+            assert [str(entry) for entry in combined[day][slot]] == [str(entry) for entry in restored[day][slot]] == expected
+            rows = combined.rows(day, slot)
+            assert combined.cell_texts(rows) == [entry.cell_text for entry in combined[day][slot]]
+
+
+class FakeRoot:
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    # Run the scheduled callbacks, as the mainloop would, until `done` holds
+    def run_until(self, done, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not done() and time.monotonic() < deadline:
+            callbacks, self.callbacks = self.callbacks, []
+            for callback in callbacks:
+                callback()
+            time.sleep(0.005)
+
+
+def test_background_worker_only_delivers_the_newest_result():
+    root = FakeRoot()
+    worker = BackgroundWorker(root, poll_ms=1)
+    started, release = threading.Event(), threading.Event()
+    cancels, results, failures = [], [], []
+
+    def slow(cancel):
+        cancels.append(cancel)
+        started.set()
+        release.wait(5)
+        return "superseded while running"
+
+    worker.submit(slow, results.append)
+    assert started.wait(5)
+    worker.submit(lambda cancel: "superseded while queued", results.append)
+    worker.submit(lambda cancel: "newest", results.append)
+    assert cancels[0].is_set()
+    release.set()
+    root.run_until(lambda: not worker.busy)
+    assert results == ["newest"]
+    worker.submit(lambda cancel: 1 / 0, results.append, failures.append)
+    root.run_until(lambda: not worker.busy)
+    assert results == ["newest"] and [type(error) for error in failures] == [ZeroDivisionError]
+
+
+def test_friday_entries_are_reported():
+    text = timetable({"Thursday": {0: ["10MET T001\tB1.01\tHUMA 1001 Tut"]}}) + "Friday\n10MET T002\tB1.02\tHUMA 1001 Tut\n"
+    entry = text.splitlines().index("Friday") + 2
+    assert errors(text) == [(entry, "entry on Friday, which the timetable grid doesn't have"),
+                            (entry, "Friday has 0 slot separators, expected 5")]
+    assert parse_data(text, [])["Thursday"]["Slot 1"][0].group == "T001"
+
+
+def test_short_lines_are_reported():
+    text = timetable({"Sunday": {1: ["10MET T009\tD4.101", "10MET T010\tD4.102\tCSEN 1003 Tut"]}})
+    assert [message for _, message in errors(text)] == ["expected a day, Free, a line of asterisks or course code, group, location and course name"]
+    assert [entry.group for entry in parse_data(text, [])["Sunday"]["Slot 2"]] == ["T010"]
+
+
+def test_wrong_separator_counts_are_reported():
+    missing = timetable({}).replace("Sunday\nFree\n**********\n", "Sunday\nFree\n", 1)
+    monday = missing.splitlines().index("Monday") + 1
+    assert errors(missing) == [(monday, "Sunday has 4 slot separators, expected 5")]
+    extra = timetable({}).replace("Monday\n", "Monday\n10MET T001\tB1.01\tHUMA 1001 Tut\n**********\n", 1)
+    tuesday = extra.splitlines().index("Tuesday") + 1
+    assert errors(extra) == [(tuesday, "Monday has 6 slot separators, expected 5")]
+
+
+def test_entries_before_the_first_day_and_repeated_days():
+    text = "10MET T001\tB1.01\tHUMA 1001 Tut\n" + timetable({}) + "Monday\n"
+    assert errors(text)[0] == (1, "entry before the first day header")
+    assert any(message == "Monday appears twice" for _, message in errors(text))
+
+
+def test_malformed_text_raises_without_a_diagnostics_list():
+    with pytest.raises(ScheduleParseError) as raised:
+        parse_data(timetable({"Sunday": {0: ["10MET T009"]}}))
+    assert "line 13: expected a day" in str(raised.value)
+
+
+def test_cache_keys_change_with_the_parser(monkeypatch):
+    key = ScheduleCache.source_key(schedule.data[0])
+    monkeypatch.setattr(schedule, "_PARSER_VERSION", schedule._PARSER_VERSION + 1)
+    assert ScheduleCache.source_key(schedule.data[0]) != key
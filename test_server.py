@@ -0,0 +1,22 @@
+import json
+
+import schedule
+from schedule import ELECTIVE, SEMINAR, ScheduleIndex
+from server import ScheduleServer
+
+
+def test_respond():
+    index = ScheduleIndex(schedule.ingest(schedule.data, workers=1))
+    server = ScheduleServer(index, cache_size=2)
+    status, body = server.respond("/filter?core_filter=009&elective1=NETW%201009&elective1_tut=001&elective2=None")
+    assert status == 200 and json.loads(body) == index.filter_schedules("009", "NETW 1009", "001")
+    assert server.respond("/filter?core_filter=009&elective1=NETW%201009&elective1_tut=001&elective2=None")[1] is body
+    assert server.respond("/core-tutorials") == (200, json.dumps(index.core_tutorials()).encode())
+    assert server.respond("/courses") == (200, json.dumps(index.course_names(ELECTIVE)).encode())
+    assert server.respond("/courses?type=seminar") == (200, json.dumps(index.course_names(SEMINAR)).encode())
+    assert server.respond("/elective-tutorials?name=NETW%201009") == (200, json.dumps(index.elective_tutorials("NETW 1009")).encode())
+    for target, message in (("/filter?core=009", "unknown parameters: core"), ("/courses?type=lab", "type must be elective or seminar"),
+                            ("/elective-tutorials", "missing name")):
+        assert server.respond(target) == (400, json.dumps({"error": message}).encode())
+    assert server.respond("/rooms?day=Sunday") == (404, json.dumps({"error": "no such endpoint /rooms"}).encode())
+    assert len(server._responses) == 2  # Only answers are cached, and at most cache_size of them
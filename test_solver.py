@@ -0,0 +1,170 @@
+import itertools
+
+import pytest
+
+import schedule
+import solver
+from schedule import CORE, DAYS, ELECTIVE, SEMINAR, SLOTS, ScheduleIndex, parse_data
+from solver import CampusDays, ChoicePropagator, Combination, CombinationSolver, CompatibilityMatrix, IdleSlots, Weighted
+from synthetic import generate_timetable
+
+
+def entries(combined):
+    for day, slots in combined.items():
+        for slot, cell in slots.items():
+            for entry in cell:
+                yield day, slot, entry
+
+
+def cells(combined, keep):
+    return frozenset((day, slot) for day, slot, entry in entries(combined) if keep(entry))
+
+
+# Core lectures a group attends: those of the sources (and course codes) its tutorials and labs come from
+def core_lectures(parts, number):
+    taken = set()
+    for part in parts:
+        codes = {entry.course_code for _, _, entry in entries(part)
+                 if entry.category == CORE and not entry.is_lecture and entry.group_number == number}
+        taken |= cells(part, lambda entry: entry.category == CORE and entry.is_lecture and entry.course_code in codes)
+    return taken
+
+
+# Every clash-free combination of the parsed sources, worked out from the entries alone: the core group
+# and its lectures are always taken, then two electives (a tutorial each, with the course's lectures)
+# and a seminar must not share a cell with them or with each other
+def brute_force(*parts):
+    combined = schedule.combine_schedules(*parts)
+    index = ScheduleIndex(combined)
+    cores = [(number, core_lectures(parts, number) | cells(combined, lambda entry: entry.category == CORE and not entry.is_lecture
+                                                           and entry.group_number == number))
+             for number in index.core_tutorials()]
+    options = []
+    for name in index.course_names(ELECTIVE):
+        course = cells(combined, lambda entry: entry.category == ELECTIVE and entry.base_name == name and entry.is_lecture)
+        for tutorial in index.elective_tutorials(name) or [None]:
+            options.append((name, tutorial, course | cells(combined, lambda entry: entry.category == ELECTIVE and entry.base_name == name
+                                                             and not entry.is_lecture and entry.group_number == tutorial)))
+    seminars = [(name, cells(combined, lambda entry: entry.category == SEMINAR and entry.base_name == name)) for name in index.course_names(SEMINAR)]
+    found = {}
+    for core, used in cores:
+        for first, second in itertools.combinations(options, 2):
+            if first[0] == second[0] or used & first[2] or used & second[2] or first[2] & second[2]:
+                continue
+            for seminar, seminar_cells in seminars:
+                taken = used | first[2] | second[2]
+                if not taken & seminar_cells:
+                    found[Combination(core, first[0], first[1], second[0], second[1], seminar)] = taken | seminar_cells
+    return found
+
+
+@pytest.fixture(params=[1, 7])
+def combined(request):
+    return parse_data(generate_timetable(core_groups=4, electives=5, elective_groups=3, seminars=4, lecture_size=4, seed=request.param))
+
+
+def test_search_matches_brute_force(combined):
+    found = brute_force(combined)
+    lectures = cells(combined, lambda entry: entry.category == CORE and entry.is_lecture)
+    search = CombinationSolver(ScheduleIndex(combined))
+    assert found
+    assert set(search.search()) == set(found)
+    # Some elective or seminar must clash with a core lecture, or the lectures aren't being tested
+    electives = ScheduleIndex(combined).course_names(ELECTIVE) + ScheduleIndex(combined).course_names(SEMINAR)
+    assert any(lectures & cells(combined, lambda entry: entry.base_name == name) for name in electives)
+    for combination, taken in found.items():
+        assert search.mask(combination) == sum(search.bits[cell] for cell in taken)
+
+
+# The embedded sources are two lecture groups: 005 to 015 attend L001 and 016 to 026 attend L002
+def test_core_groups_only_take_their_own_lectures():
+    parts = [parse_data(source) for source in schedule.data]
+    search = CombinationSolver(ScheduleIndex(schedule.combine_schedules(*parts)))
+    assert set(search.search()) == set(brute_force(*parts))
+    # CSEN 1038 clashes with an L001 lecture only, so it fits the groups of L002
+    fits = {combination.core_filter for combination in search.search(electives=["CSEN 1038"], n_electives=1, seminars=[])}
+    assert fits and all(number >= "016" for number in fits)
+    compat = CompatibilityMatrix(search)
+    assert "CSEN 1038" in compat.compatible_courses([(CORE, "016", None)], ELECTIVE)
+    assert "CSEN 1038" not in compat.compatible_courses([(CORE, "005", None)], ELECTIVE)
+
+
+def campus_days_and_idle(taken):
+    days = idle = 0
+    for day in DAYS:
+        busy = [i for i, slot in enumerate(SLOTS) if (day, slot) in taken]
+        if busy:
+            days += 1
+            idle += busy[-1] - busy[0] + 1 - len(busy)
+    return days, idle
+
+
+def test_best_matches_brute_force(combined):
+    found = brute_force(combined)
+    costs = sorted(10 * days + idle for days, idle in map(campus_days_and_idle, found.values()))
+    ranked = CombinationSolver(ScheduleIndex(combined)).best(5, Weighted({CampusDays(): 10, IdleSlots(): 1}))
+    assert [result.cost for result in ranked] == costs[:5]
+    for result in ranked:
+        days, idle = campus_days_and_idle(found[result.combination])
+        assert result.cost == 10 * days + idle
+        assert result.schedule == ScheduleIndex(combined).filter_schedules(*result.combination)
+
+
+def test_best_respects_filters_and_k():
+    search = CombinationSolver(ScheduleIndex(schedule.ingest(schedule.data, workers=1)))
+    assert search.best(0, CampusDays()) == []
+    core = search.index.core_tutorials()[0]
+    ranked = search.best(3, IdleSlots(), core_groups=[core], n_electives=1, seminars=[])
+    assert ranked and all(result.combination.core_filter == core and result.combination.elective2 is None
+                          and result.combination.seminar is None for result in ranked)
+    with pytest.raises(ValueError):
+        search.best(1, CampusDays(), n_electives=3)
+
+
+def test_compatible_agrees_with_and_without_numpy(monkeypatch):
+    search = CombinationSolver(ScheduleIndex(schedule.ingest(schedule.data, workers=1)))
+    compat = CompatibilityMatrix(search)
+    candidates = [key for key in compat.keys if key[0] != CORE]
+    expected = [compat.compatible([(CORE, core, None)], candidates) for core in search.core_masks]
+    monkeypatch.setattr(solver, "np", None)
+    compat = CompatibilityMatrix(search)
+    assert compat.matrix is None
+    assert [compat.compatible([(CORE, core, None)], candidates) for core in search.core_masks] == expected
+
+
+def test_compatibility_update_matches_a_fresh_matrix():
+    combined = parse_data(generate_timetable(majors=1, seed=4))
+    index = ScheduleIndex(combined)
+    search = CombinationSolver(index)
+    compat = CompatibilityMatrix(search)
+    sunday, wednesday = ([combined.fields(row) for row in combined.rows(day, slot)] for day, slot in (("Sunday", "Slot 1"), ("Wednesday", "Slot 4")))
+    # A core lecture moves to the emptied Tuesday slot, which changes every group that attends it
+    lecture = next((day, slot) for day, slot, entry in entries(combined) if entry.category == CORE and entry.is_lecture)
+    moved = [combined.fields(row) for row in combined.rows(*lecture)]
+    changed = index.update_rows(*combined.set_cells({("Sunday", "Slot 1"): wednesday, ("Wednesday", "Slot 4"): sunday,
+                                                     ("Tuesday", "Slot 2"): moved, lecture: []}))
+    assert changed[CORE] == set(index.core_groups)
+    search.update(changed)
+    compat.update(changed)
+    fresh = CompatibilityMatrix(CombinationSolver(ScheduleIndex(combined)))
+    assert search.core_masks == fresh.solver.core_masks
+    assert compat.keys == fresh.keys and compat.masks == fresh.masks
+    assert (compat.matrix == fresh.matrix).all()
+
+
+def test_pins_are_undone_exactly():
+    search = CombinationSolver(ScheduleIndex(parse_data(generate_timetable(seed=2))))
+    compat = CompatibilityMatrix(search)
+    propagator = ChoicePropagator(compat)
+    before = {variable: propagator.values(variable) for variable in ChoicePropagator.VARIABLES}
+    for key in before["core"][:3]:
+        propagator.pin("core", "core", {compat.rows[key]})
+        assert propagator.values("core") == [key]
+        electives = propagator.values("elective1")
+        propagator.pin("elective", "elective1", {compat.rows[electives[0]]})
+        # Every value left for the seminar fits the pinned core group and elective
+        assert all(compat.compatible([key, electives[0]], [seminar]) for seminar in propagator.values("seminar"))
+        assert propagator.undo() == "elective"
+        assert propagator.values("elective1") == electives
+        assert propagator.undo() == "core"
+        assert {variable: propagator.values(variable) for variable in ChoicePropagator.VARIABLES} == before
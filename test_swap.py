@@ -0,0 +1,63 @@
+import csv
+import random
+from collections import Counter
+
+import schedule
+from schedule import ScheduleIndex
+from solver import Combination, CombinationSolver
+from swap import SwapMatcher, SwapRequest, match_requests
+
+
+def solver():
+    return CombinationSolver(ScheduleIndex(schedule.ingest(schedule.data, workers=1)))
+
+
+# Every student moves at most once, into a group they asked for that fits their timetable,
+# and every group of a cycle gets back as many students as it loses
+def check(matcher, cycles):
+    requests = {request.student: request for request in matcher.requests}
+    moved = [move.student for cycle in cycles for move in cycle]
+    assert len(moved) == len(set(moved))
+    for cycle in cycles:
+        assert len(cycle) >= 2 and len({move.course for move in cycle}) == 1
+        assert Counter(move.current for move in cycle) == Counter(move.target for move in cycle)
+        for move in cycle:
+            request = requests[move.student]
+            assert (move.course, move.current) == (request.course, request.current) and move.target in request.targets
+            assert matcher._clash_free(matcher._moved(request, move.target))
+
+
+def test_swaps_and_cycles_from_a_file(tmp_path):
+    path = tmp_path / "requests.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["student", "core_filter", "elective1", "elective1_tut", "change", "want"])
+        writer.writerows([["a", "9", "", "", "", "010"], ["b", "010", "", "", "", "009"],
+                          ["c", "011", "", "", "", "012"], ["d", "012", "", "", "", "013"], ["e", "013", "", "", "", "011"],
+                          ["f", "014", "", "", "", "999"], ["g", "014", "", "", "NETW 1009", "002"]])
+    matcher, cycles, errors = match_requests(solver(), path)
+    assert [[(move.student, move.target) for move in cycle] for cycle in cycles] == \
+           [[("a", "010"), ("b", "009")], [("c", "012"), ("d", "013"), ("e", "011")]]
+    assert errors == [("g", "g doesn't take NETW 1009")]
+    assert matcher.infeasible == 1  # There is no group 999
+    check(matcher, cycles)
+
+
+def test_random_requests_make_valid_cycles():
+    search = solver()
+    rng = random.Random(3)
+    matcher = SwapMatcher(search)
+    cores = list(search.core_masks)
+    electives = [name for name, options in search.elective_options.items() if len(options) > 1]
+    for n in range(400):
+        elective = rng.choice(electives)
+        tutorials = [tutorial for tutorial, _ in search.elective_options[elective]]
+        combination = Combination(rng.choice(cores), elective, rng.choice(tutorials), None, None, None)
+        if n % 2:
+            request = SwapRequest(f"s{n}", combination, "core", combination.core_filter, rng.sample(cores, 2))
+        else:
+            request = SwapRequest(f"s{n}", combination, elective, combination.elective1_tut, rng.sample(tutorials, 2))
+        matcher.add(request._replace(targets=[target for target in request.targets if target != request.current]))
+    cycles = matcher.match()
+    assert any(len(cycle) == 2 for cycle in cycles) and any(len(cycle) > 2 for cycle in cycles)
+    check(matcher, cycles)
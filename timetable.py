@@ -0,0 +1,75 @@
+import sys
+
+
+# Days and slots of the weekly grid
+DAYS = ["Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday"]
+SLOTS = [f"Slot {i+1}" for i in range(5)]
+
+# Course categories, derived from the course code suffix (e.g., 10MET, 10MET-EL, 10MET-Seminar)
+CORE = "core"
+ELECTIVE = "elective"
+SEMINAR = "seminar"
+
+
+# Category of a course code
+def course_category(course_code):
+    if "-EL" in course_code:
+        return ELECTIVE
+    if "-Seminar" in course_code:
+        return SEMINAR
+    return CORE
+
+
+# A single class of the schedule, tokenized once when parsed
+class Entry:
+    __slots__ = ("course_code", "category", "group", "group_kind", "group_number", "location",
+                 "course_name", "base_name", "session_type", "is_lecture", "_cell_text")
+
+    def __init__(self, course_code, group, location, course_name):
+        self.course_code = sys.intern(course_code)  # e.g., 10MET-EL
+        self.category = course_category(course_code)
+        self.group = sys.intern(group)  # e.g., T009, P008, L001
+        self.group_kind = sys.intern(group[:1])  # T, P or L
+        self.group_number = sys.intern(group[1:])  # e.g., 009
+        self.location = sys.intern(location)
+        self.course_name = sys.intern(course_name)  # e.g., CSEN 1002 Lab
+        base_name, _, session_type = course_name.rpartition(" ")
+        self.base_name = sys.intern(base_name)  # e.g., CSEN 1002
+        self.session_type = sys.intern(session_type)  # e.g., Lab, Tut, Lecture
+        self.is_lecture = session_type.lower() == "lecture"
+        self._cell_text = None
+
+    # Display text of the entry in a table cell, only built once the entry is actually shown
+    @property
+    def cell_text(self):
+        if self._cell_text is None:
+            self._cell_text = f"{self.group} {self.course_name} {self.location}"
+        return self._cell_text
+
+    def __str__(self):
+        return f"{self.course_code} {self.group} {self.location} {self.course_name}"
+
+    def __repr__(self):
+        return f"Entry({str(self)!r})"
+
+    # Pickle the tokenized fields as they are, so unpickling (e.g., the result of a worker process)
+    # only sets them instead of tokenizing every entry again
+    def __reduce__(self):
+        return _restore_entry, (self.course_code, self.category, self.group, self.group_kind, self.group_number, self.location,
+                                self.course_name, self.base_name, self.session_type, self.is_lecture)
+
+
+def _restore_entry(course_code, category, group, group_kind, group_number, location, course_name, base_name, session_type, is_lecture):
+    entry = Entry.__new__(Entry)
+    entry.course_code = course_code
+    entry.category = category
+    entry.group = group
+    entry.group_kind = group_kind
+    entry.group_number = group_number
+    entry.location = location
+    entry.course_name = course_name
+    entry.base_name = base_name
+    entry.session_type = session_type
+    entry.is_lecture = is_lecture
+    entry._cell_text = None
+    return entry